@@ -0,0 +1,110 @@
+import glob
+import os
+from collections import namedtuple
+
+from src.assembly.assembler import Assembler
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+"""
+A program to benchmark.
+
+name: Name of the case, unique within a corpus.
+source: Brainfuck source code.
+input: Bytes of input. Programs that read until a zero byte are given one at the end, so that
+    they end whatever an engine does at end of input.
+"""
+Case = namedtuple('Case', ['name', 'source', 'input'])
+
+SAMPLE = b'The quick brown fox jumps over the lazy dog.\n'
+
+# Input for, and code to put before, the programs in test/ that need them. add32 moves left of
+# where it starts.
+FILES = {
+    'Echo.bf': ('', SAMPLE * 20 + b'\0'),
+    'add32.bf': ('>', b''),
+}
+
+
+def files(directory=os.path.join(ROOT, 'test')):
+    """
+    :param directory: Directory of .bf files.
+    :return: List of a Case for each file, named after it.
+    """
+    cases = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.bf'))):
+        name = os.path.basename(path)
+        prefix, data = FILES.get(name, ('', b''))
+        with open(path) as file:
+            cases.append(Case(name, prefix + file.read(), data))
+    return cases
+
+
+def assembled(directory=os.path.join(ROOT, 'src', 'subroutines')):
+    """
+    Assembles the .asm files of a directory. Files that do not assemble are skipped.
+
+    :param directory: Directory of .asm files.
+    :return: List of a Case for each file that assembled, named after it.
+    """
+    cases = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.asm'))):
+        with open(path) as file:
+            text = file.read()
+        try:
+            source = Assembler().assemble(text)
+        except Exception:
+            continue
+        cases.append(Case(os.path.basename(path), source, b''))
+    return cases
+
+
+def nested(depth, count):
+    """
+    :return: Source of depth loops nested in each other, each running count times.
+    """
+    return ('+' * count + '[>') * depth + '+' + '<-]' * depth
+
+
+def scans(length, passes):
+    """
+    :return: Source that sets length cells and scans across them and back passes times. Passes
+        must be less than 256.
+    """
+    return '+' * passes + '>>' + '+>' * length + '<[<]<' + '[->>[>]<[<]<]'
+
+
+def echo(size):
+    """
+    :return: Source that copies its input to its output, and input of size bytes for it.
+    """
+    return ',[.,]', (SAMPLE * (size // len(SAMPLE) + 1))[:size] + b'\0'
+
+
+def output(count):
+    """
+    :return: Source that outputs every byte value count times.
+    """
+    return '+' * count + '[>-[.-]<-]'
+
+
+def generated():
+    """
+    :return: List of stress programs: deeply nested loops, long scans and heavy I/O.
+    """
+    source, data = echo(200000)
+    return [
+        Case('nested-loops', nested(6, 10), b''),
+        Case('long-scans', scans(10000, 50), b''),
+        Case('heavy-input', source, data),
+        Case('heavy-output', output(200), b''),
+    ]
+
+
+def corpus():
+    """
+    :return: List of every Case: the programs in test/, the assembled subroutines and the
+        generated stress programs.
+    """
+    return files() + assembled() + generated()
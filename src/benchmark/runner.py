@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+from src.benchmark.corpus import ROOT, corpus
+from src.interpreter.batch import ENGINES
+from src.interpreter.cache import ProgramCache
+from src.interpreter.streams import InputSource, OutputSink
+
+
+# Name the reference build of src/brainfuck.c is reported under.
+REFERENCE = 'brainfuck.c'
+
+"""
+The timings of one case on one engine.
+
+case, engine: Names of the case and the engine.
+seconds: Wall time of the fastest run. mean: Mean wall time of the runs.
+cycles: Brainfuck instructions executed by a run.
+ops_per_second: cycles / seconds.
+peak_memory: Most bytes allocated at once during a run, as traced by tracemalloc. None for the
+    reference build, whose allocations are not traced.
+digest: SHA-256 of the output, to check that the engines agree. None for the reference build,
+    which adds a newline.
+"""
+Measurement = namedtuple('Measurement', ['case', 'engine', 'seconds', 'mean', 'cycles', 'ops_per_second',
+                                         'peak_memory', 'digest'])
+
+"""
+A measurement that got slower than its baseline.
+
+case, engine: Names of the case and the engine.
+before, after: Seconds of the baseline and of the new measurement.
+"""
+Regression = namedtuple('Regression', ['case', 'engine', 'before', 'after'])
+
+
+def measure(case, engine, warmup=1, repeat=3, memsize=30000, prefix=0):
+    """
+    Runs a case on an engine warmup times, then repeat times more, timing each run. Every run
+    builds a new interpreter, but they share a ProgramCache, so the program is only compiled by
+    the first run. Peak memory is measured on one more run, as tracing allocations slows it down.
+
+    :param case: The Case.
+    :param engine: Name of the engine in ENGINES.
+    :param warmup: Number of runs that are not timed.
+    :param repeat: Number of timed runs.
+    :param memsize: Number of memory cells.
+    :param prefix: Most cycles the engine may spend evaluating the prefix of the program, see
+        Interpreter.prefix_cycles. Off by default, since it moves programs that read no input
+        out of the timed run.
+    :return: The Measurement.
+    """
+    cache = ProgramCache()
+
+    def run():
+        digest = hashlib.sha256()
+        interpreter = ENGINES[engine](memsize=memsize, output=OutputSink(digest.update),
+                                      input=InputSource(case.input), cache=cache)
+        if prefix:
+            interpreter.prefix_cycles = prefix
+        started = time.perf_counter()
+        interpreter.run(case.source)
+        return time.perf_counter() - started, interpreter.cycles, digest.hexdigest()
+
+    for _ in range(warmup):
+        run()
+    times = []
+    cycles = digest = None
+    for _ in range(max(repeat, 1)):
+        seconds, cycles, digest = run()
+        times.append(seconds)
+    peak = None
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    best = min(times)
+    return Measurement(case.name, engine, best, sum(times) / len(times), cycles, cycles / best if best else None,
+                       peak, digest)
+
+
+def build_reference(directory, compiler=None):
+    """
+    Builds src/brainfuck.c.
+
+    :param directory: Directory to put the executable in.
+    :param compiler: C compiler to use. Defaults to the first of cc, gcc and clang found.
+    :return: Path of the executable, or None if there is no compiler or the build failed.
+    """
+    compiler = compiler or next(filter(None, map(shutil.which, ('cc', 'gcc', 'clang'))), None)
+    if compiler is None:
+        return None
+    executable = os.path.join(directory, 'brainfuck')
+    try:
+        subprocess.run([compiler, '-O2', '-o', executable, os.path.join(ROOT, 'src', 'brainfuck.c')],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return executable
+
+
+def measure_reference(case, executable, warmup=1, repeat=3, memsize=30000, cycles=None):
+    """
+    Runs a case on the reference build as measure() does, in a process of its own each time.
+    The times include starting the process.
+
+    :param case: The Case.
+    :param executable: Path returned by build_reference().
+    :param warmup: Number of runs that are not timed.
+    :param repeat: Number of timed runs.
+    :param memsize: Number of memory cells.
+    :param cycles: Cycles of the case as measured on an engine, to work out ops_per_second.
+    :return: The Measurement.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.bf', delete=False) as file:
+        file.write(case.source)
+    try:
+        def run():
+            started = time.perf_counter()
+            subprocess.run([executable, '-x', str(memsize), file.name], input=case.input,
+                           stdout=subprocess.DEVNULL)
+            return time.perf_counter() - started
+
+        for _ in range(warmup):
+            run()
+        times = [run() for _ in range(max(repeat, 1))]
+    finally:
+        os.remove(file.name)
+    best = min(times)
+    return Measurement(case.name, REFERENCE, best, sum(times) / len(times), cycles,
+                       cycles / best if cycles and best else None, None, None)
+
+
+def run_benchmarks(cases, engines=('interpreter',), warmup=1, repeat=3, memsize=30000, prefix=0,
+                   reference=False):
+    """
+    Measures every case on every engine.
+
+    :param cases: Iterable of Case.
+    :param engines: Names of engines in ENGINES.
+    :param warmup: Number of untimed runs of each case on each engine.
+    :param repeat: Number of timed runs of each case on each engine.
+    :param memsize: Number of memory cells.
+    :param prefix: Most cycles engines may spend evaluating the prefix of programs. See
+        measure().
+    :param reference: Also measure the reference build of src/brainfuck.c, if it can be built.
+    :return: Generator of Measurement, as they are taken.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        executable = build_reference(directory) if reference else None
+        for case in cases:
+            cycles = None
+            for engine in engines:
+                measurement = measure(case, engine, warmup, repeat, memsize, prefix)
+                cycles = measurement.cycles
+                yield measurement
+            if executable is not None:
+                yield measure_reference(case, executable, warmup, repeat, memsize, cycles)
+
+
+def save(path, measurements):
+    """
+    Writes measurements to a JSON file, along with the Python version and platform.
+
+    :param path: Path of the file.
+    :param measurements: Iterable of Measurement.
+    :return:
+    """
+    with open(path, 'w') as file:
+        json.dump({
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'measurements': [measurement._asdict() for measurement in measurements],
+        }, file, indent=2)
+
+
+def load(path):
+    """
+    :param path: Path of a file written by save().
+    :return: List of Measurement.
+    """
+    with open(path) as file:
+        return [Measurement(**fields) for fields in json.load(file)['measurements']]
+
+
+def compare(measurements, baseline, tolerance=0.1):
+    """
+    Finds the measurements that are slower than the baseline by more than the tolerance. Cases
+    and engines missing from either are ignored.
+
+    :param measurements: Iterable of Measurement.
+    :param baseline: Iterable of Measurement to compare against.
+    :param tolerance: Fraction of the baseline's time a measurement may be slower by.
+    :return: List of Regression.
+    """
+    before = {(measurement.case, measurement.engine): measurement.seconds for measurement in baseline}
+    regressions = []
+    for measurement in measurements:
+        seconds = before.get((measurement.case, measurement.engine))
+        if seconds is not None and measurement.seconds > seconds * (1 + tolerance):
+            regressions.append(Regression(measurement.case, measurement.engine, seconds, measurement.seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Times the engines on the benchmark corpus.")
+    parser.add_argument('-e', '--engine', action='append', choices=sorted(ENGINES),
+                        help="Engine to measure. May be repeated. Defaults to every engine")
+    parser.add_argument('-k', '--case', action='append', default=[],
+                        help="Only measure cases whose name contains this. May be repeated")
+    parser.add_argument('-w', '--warmup', type=int, default=1)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-m', '--memsize', type=int, default=30000)
+    parser.add_argument('--prefix', type=int, default=0, metavar='CYCLES',
+                        help="Let engines spend up to this many cycles evaluating the prefix of programs")
+    parser.add_argument('--reference', action='store_true',
+                        help="Also measure src/brainfuck.c, if a C compiler is available")
+    parser.add_argument('-o', '--output', help="JSON file to write the measurements to")
+    parser.add_argument('-b', '--baseline', help="JSON file of measurements to compare against")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.1,
+                        help="Fraction a measurement may be slower than the baseline by")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in corpus() if not args.case or any(name in case.name for name in args.case)]
+    engines = args.engine or sorted(ENGINES)
+    measurements = []
+    print(f"{'case':<20} {'engine':<12} {'seconds':>10} {'ops/sec':>12} {'peak KiB':>10} {'cycles':>12}")
+    for measurement in run_benchmarks(cases, engines, args.warmup, args.repeat, args.memsize, args.prefix,
+                                      args.reference):
+        measurements.append(measurement)
+        ops = '' if measurement.ops_per_second is None else f'{measurement.ops_per_second:.0f}'
+        peak = '' if measurement.peak_memory is None else f'{measurement.peak_memory / 1024:.0f}'
+        cycles = '' if measurement.cycles is None else measurement.cycles
+        print(f"{measurement.case:<20} {measurement.engine:<12} {measurement.seconds:>10.4f} {ops:>12} {peak:>10} "
+              f"{cycles:>12}", flush=True)
+    if args.output:
+        save(args.output, measurements)
+    if args.baseline:
+        regressions = compare(measurements, load(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression.case} on {regression.engine} took {regression.after:.4f}s, "
+                  f"{regression.after / regression.before:.2f}x the baseline's {regression.before:.4f}s")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
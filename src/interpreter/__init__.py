@@ -0,0 +1 @@
+from src.interpreter.interpreter import Interpreter
@@ -0,0 +1,200 @@
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import sys
+import warnings
+from collections import OrderedDict, namedtuple
+
+from src.interpreter.cache import ProgramCache
+from src.interpreter.codegen import CodegenInterpreter
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.snapshot import Snapshot
+from src.interpreter.threaded import ThreadedInterpreter
+from src.interpreter.tiered import TieredInterpreter
+from src.interpreter.streams import InputSource, OutputLimitExceeded, OutputSink
+
+
+ENGINES = {
+    'interpreter': Interpreter,
+    'codegen': CodegenInterpreter,
+    'threaded': ThreadedInterpreter,
+    'tiered': TieredInterpreter,
+}
+
+"""
+A single execution of a program against an input.
+
+id: Anything that identifies the job in its Result.
+source: Brainfuck source code.
+input: Input bytes.
+max_cycles: Stop the job once it has run this many cycles.
+max_output: Stop the job once it has output this many bytes.
+eof: Value read at the end of input. None leaves the cell unchanged.
+"""
+Job = namedtuple('Job', ['id', 'source', 'input', 'max_cycles', 'max_output', 'eof'],
+                 defaults=(b'', None, None, 0))
+
+"""
+The outcome of a Job.
+
+status: 'ok', 'cycle_limit', 'output_limit' or 'error'.
+output: Bytes output, up to the limit.
+digest: SHA-256 of the final tape, without trailing zero cells.
+error: Message of the exception that ended the job, if any.
+"""
+Result = namedtuple('Result', ['id', 'status', 'output', 'cycles', 'digest', 'error'])
+
+# Each worker process keeps its own cache of compiled programs between jobs, and of
+# snapshots of programs stopped at their first input.
+_cache = None
+_snapshots = OrderedDict()
+SNAPSHOTS = 16
+
+
+def _init_worker(directory):
+    global _cache
+    _cache = ProgramCache(directory)
+
+
+def _snapshot(source, engine, memsize, max_cycles):
+    """
+    :param max_cycles: Most cycles to run the program for before its first input.
+    :return: The worker's Snapshot of the program at its first input, or None if the program
+        fails or runs max_cycles before it gets there.
+    """
+    key = (source, engine, memsize, max_cycles)
+    if key in _snapshots:
+        _snapshots.move_to_end(key)
+        return _snapshots[key]
+    try:
+        snapshot = Snapshot.take(source, ENGINES[engine], memsize, max_cycles, cache=_cache)
+    except Exception:
+        snapshot = None
+    if snapshot is not None and not snapshot.finished and max_cycles is not None and snapshot.cycles >= max_cycles:
+        snapshot = None
+    _snapshots[key] = snapshot
+    if len(_snapshots) > SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return snapshot
+
+
+def run_job(job, engine='interpreter', memsize=30000, fork=False):
+    """
+    Runs a single job.
+
+    :param job: The Job.
+    :param engine: Name of the engine in ENGINES.
+    :param memsize: Number of memory cells.
+    :param fork: Run the program up to its first input once per worker, and start each job
+        from a Snapshot taken there. Jobs whose program runs max_cycles before its first
+        input are run in full. CodegenInterpreter only runs generated code from the start of a
+        program, so forked jobs on it run in Interpreter's loop.
+    :return: The Result.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ProgramCache()
+    output = OutputSink(max_bytes=job.max_output)
+    input = InputSource(job.input, eof=job.eof)
+    snapshot = _snapshot(job.source, engine, memsize, job.max_cycles) if fork else None
+    if snapshot is not None:
+        interpreter = snapshot.fork(input, output)
+        run = interpreter.resume
+    else:
+        interpreter = ENGINES[engine](memsize=memsize, output=output, input=input, cache=_cache)
+        run = functools.partial(interpreter.run, job.source)
+    error = None
+    try:
+        status = 'ok' if run(max_cycles=job.max_cycles) else 'cycle_limit'
+    except OutputLimitExceeded:
+        status = 'output_limit'
+    except Exception as e:
+        status = 'error'
+        error = f"{type(e).__name__}: {e}"
+    digest = hashlib.sha256(interpreter.memory.cells.rstrip(b'\0')).hexdigest()
+    return Result(job.id, status, output.getvalue(), interpreter.cycles, digest, error)
+
+
+def run_batch(jobs, workers=None, engine='interpreter', memsize=30000, cache_directory=None, fork=False):
+    """
+    Runs jobs across a pool of worker processes, yielding results as they finish. Only a few
+    jobs per worker are submitted ahead, so jobs may be a long-running generator.
+
+    :param jobs: Iterable of Jobs.
+    :param workers: Number of worker processes. Defaults to the number of CPUs. 0 runs the jobs
+        in this process.
+    :param engine: Name of the engine in ENGINES.
+    :param memsize: Number of memory cells.
+    :param cache_directory: Directory of the workers' ProgramCache. None caches in memory only.
+    :param fork: Start jobs from a snapshot of their program at its first input. See run_job().
+    :return: Generator of Results, in order of completion.
+    """
+    if fork and engine == 'codegen':
+        warnings.warn("Forked jobs on the codegen engine run in the interpreter loop, not in generated code",
+                      RuntimeWarning)
+    if workers == 0:
+        _init_worker(cache_directory)
+        for job in jobs:
+            yield run_job(job, engine, memsize, fork)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker,
+                                                initargs=(cache_directory,)) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(run_job, job, engine, memsize, fork))
+            if len(pending) >= workers * 4:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs every program against every input, in parallel. "
+                                                 "Prints one JSON result per line as jobs finish.")
+    parser.add_argument('programs', nargs='+', help="Brainfuck source files")
+    parser.add_argument('-i', '--input', action='append', default=[],
+                        help="Input file. May be repeated. Programs get no input if omitted")
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-e', '--engine', choices=sorted(ENGINES), default='interpreter')
+    parser.add_argument('-m', '--memsize', type=int, default=30000)
+    parser.add_argument('--max-cycles', type=int, default=None)
+    parser.add_argument('--max-output', type=int, default=None)
+    parser.add_argument('--cache', default=None, help="Directory to cache compiled programs in")
+    parser.add_argument('--fork', action='store_true',
+                        help="Run each program up to its first input once per worker, and start every job from there")
+    args = parser.parse_args(argv)
+
+    sources = {}
+    for path in args.programs:
+        with open(path) as file:
+            sources[path] = file.read()
+    inputs = {}
+    for path in args.input:
+        with open(path, 'rb') as file:
+            inputs[path] = file.read()
+    if not inputs:
+        inputs[None] = b''
+
+    jobs = (Job((program, name), source, data, args.max_cycles, args.max_output)
+            for program, source in sources.items() for name, data in inputs.items())
+    for result in run_batch(jobs, args.workers, args.engine, args.memsize, args.cache, args.fork):
+        print(json.dumps({
+            'program': result.id[0],
+            'input': result.id[1],
+            'status': result.status,
+            'cycles': result.cycles,
+            'digest': result.digest,
+            'output': result.output.decode('latin-1'),
+            'error': result.error,
+        }), flush=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
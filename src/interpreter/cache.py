@@ -0,0 +1,179 @@
+import hashlib
+import io
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import types
+from collections import OrderedDict
+
+
+# Bump whenever the compiled forms change shape, so stale entries are never loaded.
+FORMAT = 6
+
+
+def default_directory():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'brainfuck')
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickles code objects through marshal, so compiled Python code can be cached as well.
+    """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, types.CodeType):
+            return marshal.loads, (marshal.dumps(obj),)
+        return NotImplemented
+
+
+class ProgramCache:
+    """
+    Caches compiled programs, keyed by a hash of the source and the options they were
+    compiled with. A small in-memory LRU sits in front of a directory of pickled entries.
+    Entries are written atomically, and the least recently used are deleted once the
+    directory holds more than max_bytes.
+
+    A cache may be shared by several threads. The in-memory entries are guarded by a lock;
+    threads that miss on the same program at once each build it.
+    """
+
+    def __init__(self, directory=None, capacity=64, max_bytes=256 * 1024 * 1024):
+        """
+        :param directory: Where entries are stored. None keeps entries in memory only.
+        :param capacity: Number of entries kept in memory.
+        :param max_bytes: Total size of the entries kept on disk.
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, options):
+        """
+        :param source: Brainfuck source code.
+        :param options: Anything whose repr identifies how the source is compiled.
+        :return: Hex digest identifying the compiled program.
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((FORMAT, sys.version_info[:2], options)).encode())
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def fetch(self, source, options, build):
+        """
+        Returns the cached compiled program, building and storing it on a miss.
+
+        :param source: Brainfuck source code.
+        :param options: See key().
+        :param build: Called with the source on a miss. Returns the compiled program.
+        :return: The compiled program.
+        """
+        key = self.key(source, options)
+        value = self.get(key)
+        if value is None:
+            with self.lock:
+                self.misses += 1
+            value = build(source)
+            self.put(key, value)
+        else:
+            with self.lock:
+                self.hits += 1
+        return value
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A corrupt or unreadable entry is a miss. It is replaced on the next put().
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Another process evicted the entry after it was read.
+            pass
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.directory is None:
+            return
+        buffer = io.BytesIO()
+        _Pickler(buffer, pickle.HIGHEST_PROTOCOL).dump(value)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(buffer.getvalue())
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            self._remove(temporary)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used entries on disk until they fit in max_bytes.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.bfc'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # Evicted by another thread or process meanwhile.
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.directory is not None:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith('.bfc'):
+                        self._remove(entry.path)
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.bfc')
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+
+from src.interpreter.cache import FORMAT
+
+
+MAGIC = b'BFCP'
+VERSION = 1
+
+# A record is its kind and the length of its compressed payload, followed by the payload.
+RECORD = struct.Struct('<cI')
+FULL = b'F'
+DELTA = b'D'
+
+# The payload starts with the program identity, dptr, iptr, cycles, input position, memsize,
+# number of cells allocated and page size, followed by (page number, cells) pairs.
+STATE = struct.Struct('<32sqQQQQQI')
+PAGE = struct.Struct('<I')
+
+
+def identity(interpreter):
+    """
+    :return: Digest of everything iptr depends on: the source and how it was compiled.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((VERSION, FORMAT, interpreter.compiler.optimize)).encode())
+    digest.update(interpreter.source.encode('utf-8', 'surrogatepass'))
+    return digest.digest()
+
+
+class Checkpointer:
+    """
+    Saves the state of an interpreter to a file, so that a run that is killed can be resumed
+    from the last checkpoint instead of from the start.
+
+    The file holds a full checkpoint followed by deltas. A delta holds only the pages of the
+    tape that changed since the previous checkpoint, found by comparing the tape against a copy
+    taken at that checkpoint, so the engines pay nothing between checkpoints. Once the deltas
+    outgrow the full checkpoint, the file is rewritten as a new full checkpoint.
+
+    Output is not part of the state: output produced after the last checkpoint is produced
+    again when the run is resumed.
+    """
+
+    def __init__(self, path, interval=10000000):
+        """
+        :param path: File to save checkpoints to.
+        :param interval: Number of cycles between checkpoints in run().
+        """
+        self.path = path
+        self.interval = interval
+        self.image = None
+        self.full_size = 0
+        self.delta_size = 0
+
+    def run(self, interpreter, source=None, max_cycles=None):
+        """
+        Runs the program, saving a checkpoint every interval cycles. If the file holds a
+        checkpoint, the run continues from it instead of starting over. The file is removed
+        once the program finishes.
+
+        :param interpreter: The Interpreter, with its input at the start.
+        :param source: Brainfuck source code. Defaults to the loaded source.
+        :param max_cycles: Stop once cycles reaches this total.
+        :return: True if the program finished, False if it was stopped.
+        """
+        if source is not None:
+            interpreter.load(source)
+        if not self.restore(interpreter):
+            interpreter.start(max_cycles)
+        while True:
+            limit = interpreter.cycles + self.interval
+            if max_cycles is not None:
+                limit = min(limit, max_cycles)
+            if interpreter.resume(limit):
+                self.image = None
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return True
+            self.save(interpreter)
+            if interpreter.waiting or (max_cycles is not None and interpreter.cycles >= max_cycles):
+                return False
+
+    def save(self, interpreter):
+        """
+        Saves a checkpoint. The first one this Checkpointer saves is full.
+
+        :param interpreter: The Interpreter.
+        :return: Number of pages written.
+        """
+        tape = interpreter.memory
+        cells = tape.cells
+        size = tape.page_size
+        if self.image is None or self.delta_size > self.full_size:
+            pages = range((len(cells) + size - 1) // size)
+            kind = FULL
+        else:
+            # Pages allocated since the last checkpoint were zero then, and restore() fills
+            # them with zeros, so they are dirty only if something was written to them.
+            image = self.image
+            pages = []
+            for page in range((len(cells) + size - 1) // size):
+                current = cells[page * size:(page + 1) * size]
+                if current != image[page * size:(page + 1) * size] if page * size < len(image) else any(current):
+                    pages.append(page)
+            kind = DELTA
+        parts = [STATE.pack(identity(interpreter), interpreter.dptr, interpreter.iptr, interpreter.cycles,
+                            interpreter.input.position, tape.size, len(cells), size)]
+        for page in pages:
+            parts.append(PAGE.pack(page))
+            parts.append(cells[page * size:(page + 1) * size])
+        payload = zlib.compress(b''.join(parts))
+        record = RECORD.pack(kind, len(payload)) + payload
+
+        if kind == FULL:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as file:
+                    file.write(MAGIC + bytes((VERSION,)) + record)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temporary, self.path)
+            except BaseException:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+                raise
+            self.full_size = len(record)
+            self.delta_size = 0
+        else:
+            with open(self.path, 'ab') as file:
+                file.write(record)
+                file.flush()
+                os.fsync(file.fileno())
+            self.delta_size += len(record)
+        self.image = bytes(cells)
+        return len(pages)
+
+    def restore(self, interpreter):
+        """
+        Restores the state saved in the file. A record cut short by a crash while it was being
+        written is ignored, so the state is that of the last complete checkpoint.
+
+        :param interpreter: The Interpreter, with the program loaded and its input at the start.
+        :return: True if a checkpoint was restored, False if there is none.
+        """
+        try:
+            with open(self.path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return False
+        if data[:len(MAGIC) + 1] != MAGIC + bytes((VERSION,)):
+            raise ValueError(f"{self.path} is not a version {VERSION} checkpoint")
+
+        state = None
+        cells = bytearray()
+        offset = len(MAGIC) + 1
+        while offset + RECORD.size <= len(data):
+            kind, length = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + length > len(data):
+                break
+            payload = zlib.decompress(data[offset:offset + length])
+            offset += length
+            state = STATE.unpack_from(payload)
+            allocated, size = state[6], state[7]
+            if kind == FULL:
+                cells = bytearray(allocated)
+            else:
+                cells.extend(bytes(allocated - len(cells)))
+            position = STATE.size
+            while position < len(payload):
+                page, = PAGE.unpack_from(payload, position)
+                position += PAGE.size
+                start = page * size
+                end = min(start + size, allocated)
+                cells[start:end] = payload[position:position + end - start]
+                position += end - start
+        if state is None:
+            return False
+
+        program, dptr, iptr, cycles, position, memsize = state[:6]
+        if program != identity(interpreter):
+            raise ValueError(f"{self.path} is a checkpoint of a different program")
+        tape = interpreter.memory
+        if memsize != tape.size:
+            raise ValueError(f"{self.path} is a checkpoint of a tape of {memsize} cells, not {tape.size}")
+        skip = position - interpreter.input.position
+        if skip < 0 or interpreter.input.skip(skip) != skip:
+            raise ValueError(f"The input ended before position {position}, where the checkpoint was saved")
+        tape.cells = cells
+        interpreter.dptr = dptr
+        interpreter.iptr = iptr
+        interpreter.cycles = cycles
+        self.image = bytes(cells)
+        self.full_size = len(data)
+        self.delta_size = 0
+        return True
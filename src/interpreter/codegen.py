@@ -0,0 +1,354 @@
+import re
+
+from src.interpreter.compiler import ADD, MOVE, OUTPUT, INPUT, LOOP, CLEAR, MULTIPLY, SCAN, ADD_AT, OUTPUT_AT, INPUT_AT, \
+    Program, step_of, trips
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.tape import TapeError
+
+
+def recover(error, charges):
+    """
+    Works out where generated code was when it raised an error, from the locals of the
+    innermost generated function in the traceback of the error or of the errors it was raised
+    from.
+
+    :param error: The exception.
+    :param charges: Dictionary from the filename generated code was compiled with to its
+        charges, see CodeGenerator.charges().
+    :return: dptr and cycles as Interpreter leaves them when the same operation raises, or
+        None if the error was not raised by generated code.
+    """
+    state = None
+    while error is not None and state is None:
+        traceback = error.__traceback__
+        while traceback is not None:
+            lines = charges.get(traceback.tb_frame.f_code.co_filename)
+            if lines is not None:
+                local = traceback.tb_frame.f_locals
+                state = local['dptr'], local['cycles'] + lines.get(traceback.tb_lineno, 0)
+            traceback = traceback.tb_next
+        error = error.__cause__ or error.__context__
+    return state
+
+
+class Stopped(Exception):
+    """
+    Raised by code generated with cycle limits when a loop stops at its closing bracket. The
+    args are the index of the bracket's operation, dptr and cycles.
+    """
+
+
+class CodeGenerator:
+    """
+    Translates a tree of operations into Python source. Loops become while statements and
+    every other operation is written out inline, with the cycle costs of straight-line code
+    added once per block.
+
+    The source defines factory(), which binds the tape and I/O and returns main(dptr, cycles).
+    The cells up to reach past the data pointer must be allocated when main() is called. Moves
+    to the left, and cells addressed to the left of the data pointer, are checked against cell
+    0. Moves and scans to the right reserve the cells up to reach past the data pointer, as
+    Interpreter does, so the tape is allocated a page at a time and TapeError is raised past
+    its end.
+    Loops nested deeper than max_depth and blocks longer than max_lines are moved into
+    functions of their own, so that CPython can compile the source of very large programs.
+
+    Code generated with limited set checks cycles against limit at the end of every iteration
+    of every loop, and stops as Interpreter does at a closing bracket by raising stop.
+
+    Each line of an operation ends with a comment of the cycles its block has yet to add up to
+    and including the operation, so that recover() can work out the cycles when it raises.
+    """
+
+    def __init__(self, max_depth=8, max_lines=2000):
+        self.max_depth = max_depth
+        self.max_lines = max_lines
+        self.functions = []
+        self.steps = []
+        self.limited = False
+        # Index in the flat program of the next operation generated.
+        self.index = 0
+
+    def generate(self, tree, limited=False):
+        """
+        :param tree: List of operations, as returned by Compiler.build().
+        :param limited: Check cycles against limit at the end of every loop iteration.
+        :return: Python source code.
+        """
+        self.functions = []
+        self.steps = []
+        self.limited = limited
+        self.index = 0
+        return self.factory(self.function('main', self.pack(self.block(tree, 0))))
+
+    def generate_loop(self, loop):
+        """
+        Translates a single loop. The main() of its source takes a third argument, limit, and
+        runs the loop from its condition on, leaving the cost of the opening bracket to the
+        caller. After each iteration it stops, as Interpreter does at a closing bracket, once
+        the cycles before that bracket reach limit. Loops nested in it are not checked.
+
+        :param loop: A LOOP operation.
+        :return: Python source code, whose main(dptr, cycles, limit) returns dptr, cycles and
+            whether the loop ended. If it did not, cycles does not include the closing bracket.
+        """
+        self.functions = []
+        self.steps = []
+        self.limited = False
+        self.index = 0
+        body = self.pack(self.block(loop.arg, 1, extra=1))
+        main = ['def main(dptr, cycles, limit):', '    while memory[dptr]:']
+        main += ['        ' + line for line in body]
+        main += [
+            '        if cycles > limit and memory[dptr]:',
+            '            return dptr, cycles - 1, False',
+            '    return dptr, cycles, True',
+        ]
+        return self.factory(main)
+
+    def factory(self, main):
+        """
+        :param main: Lines of the main function.
+        :return: Source of factory(), holding main and the functions it calls.
+        """
+        lines = ['def factory(memory, buffer, chunk_size, newline, flush, read, scan, reserve, trips, reach,',
+                 '            limit=None, stop=None):']
+        lines += [f'    T{step} = trips({step})' for step in self.steps]
+        for function in self.functions + [main]:
+            lines += ['    ' + line for line in function]
+        lines.append('    return main')
+        return '\n'.join(lines) + '\n'
+
+    def block(self, tree, depth, extra=0):
+        """
+        :param tree: List of operations.
+        :param depth: Number of loops the block is nested in, within its function.
+        :param extra: Cycles to add at the end of the block.
+        :return: List of statements, each a list of lines.
+        """
+        statements = []
+        pending = 0
+        for op in tree:
+            pending += op.cost
+            if op.code == LOOP:
+                statements.append([f'cycles += {pending}'])
+                statements.append(self.loop(op, depth))
+                pending = 0
+            else:
+                statements.append([f'{line}  # +{pending}' for line in self.statement(op)])
+                self.index += 1
+        if pending + extra:
+            statements.append([f'cycles += {pending + extra}'])
+        return statements
+
+    def loop(self, op, depth):
+        if depth >= self.max_depth:
+            return self.call(self.loop(op, 0))
+        self.index += 1
+        body = self.pack(self.block(op.arg, depth + 1, extra=1))
+        closing = self.index
+        self.index += 1
+        lines = ['while memory[dptr]:'] + ['    ' + line for line in body]
+        if self.limited:
+            lines += ['    if cycles > limit and memory[dptr]:', f'        raise stop({closing}, dptr, cycles - 1)']
+        return lines
+
+    def statement(self, op):
+        code = op.code
+        if code == ADD:
+            return [f'memory[dptr] = (memory[dptr] + {op.arg}) & 255']
+        elif code == MOVE:
+            if op.arg < 0:
+                return [f'dptr += {op.arg}', 'if dptr < 0:', '    reserve(dptr)']
+            if op.arg > 0:
+                return [f'dptr += {op.arg}', 'if dptr >= len(memory) - reach:', '    reserve(dptr, reach)']
+            return []
+        elif code == ADD_AT:
+            offset, amount = op.arg
+            cell = f'dptr + {offset}'
+            return self.check(offset) + [f'memory[{cell}] = (memory[{cell}] + {amount}) & 255']
+        elif code == OUTPUT or code == OUTPUT_AT:
+            offset = op.arg or 0
+            cell = f'dptr + {offset}' if offset else 'dptr'
+            return self.check(offset) + [
+                f'value = memory[{cell}]',
+                'buffer.append(value)',
+                'if len(buffer) >= chunk_size or value == newline:',
+                '    flush()',
+            ]
+        elif code == INPUT or code == INPUT_AT:
+            offset = op.arg or 0
+            cell = f'dptr + {offset}' if offset else 'dptr'
+            return self.check(offset) + [
+                'value = read()',
+                'if value is not None:',
+                f'    memory[{cell}] = value',
+            ]
+        elif code == CLEAR:
+            table, itercost = op.arg
+            return [
+                'value = memory[dptr]',
+                'if value:',
+                f'    cycles += {self.table(table)}[value] * {itercost}',
+                '    memory[dptr] = 0',
+            ]
+        elif code == MULTIPLY:
+            table, itercost, pairs = op.arg
+            lines = [
+                'value = memory[dptr]',
+                'if value:',
+                f'    count = {self.table(table)}[value]',
+                f'    cycles += count * {itercost}',
+            ]
+            lines += ['    ' + line for line in self.check(pairs[0][0])]
+            for offset, factor in pairs:
+                lines.append(f'    memory[dptr + {offset}] = (memory[dptr + {offset}] + count * {factor}) & 255')
+            lines.append('    memory[dptr] = 0')
+            return lines
+        elif code == SCAN:
+            stride, itercost = op.arg
+            return [
+                'if memory[dptr]:',
+                '    start = dptr',
+                f'    dptr = scan(dptr, {stride})',
+                f'    cycles += (dptr - start) // {stride} * {itercost}',
+                '    if dptr >= len(memory) - reach:',
+                '        reserve(dptr, reach)',
+            ]
+        raise ValueError(f"Cannot generate code for operation {op}")
+
+    def check(self, offset):
+        """
+        :param offset: Offset of a cell from the data pointer.
+        :return: Lines that raise TapeError if the cell is left of cell 0.
+        """
+        if offset >= 0:
+            return []
+        return [f'if dptr < {-offset}:', f'    reserve(dptr + {offset})']
+
+    @staticmethod
+    def charges(source):
+        """
+        :param source: Python source code returned by generate() or generate_loop().
+        :return: Dictionary from line number to the cycles that line has yet to add.
+        """
+        charges = {}
+        for number, line in enumerate(source.split('\n'), 1):
+            match = re.search(r'  # \+(\d+)$', line)
+            if match:
+                charges[number] = int(match.group(1))
+        return charges
+
+    def table(self, table):
+        """
+        :param table: A trip count table built by trips().
+        :return: Name the table is bound to in the generated source.
+        """
+        amount = step_of(table)
+        if amount not in self.steps:
+            self.steps.append(amount)
+        return f'T{amount}'
+
+    def pack(self, statements):
+        """
+        Joins statements into lines. If there are more than max_lines lines, consecutive
+        statements are grouped into functions and replaced by calls.
+
+        :param statements: List of statements, each a list of lines.
+        :return: List of lines.
+        """
+        while sum(len(statement) for statement in statements) > self.max_lines:
+            calls = []
+            group = []
+            size = 0
+            for statement in statements:
+                if group and size + len(statement) > self.max_lines:
+                    calls.append(self.call(group))
+                    group = []
+                    size = 0
+                group += statement
+                size += len(statement)
+            calls.append(self.call(group))
+            statements = calls
+        return [line for statement in statements for line in statement]
+
+    def call(self, lines):
+        """
+        Moves lines into a new function.
+
+        :param lines: Body of the function.
+        :return: The lines that call it.
+        """
+        name = f'f{len(self.functions)}'
+        self.functions.append(self.function(name, lines))
+        return [f'dptr, cycles = {name}(dptr, cycles)']
+
+    def function(self, name, lines):
+        return [f'def {name}(dptr, cycles):'] + ['    ' + line for line in lines] + ['    return dptr, cycles']
+
+
+class CodegenInterpreter(Interpreter):
+    """
+    Runs brainfuck by translating the program into Python and executing the result. Leaves
+    memory, dptr and cycles exactly as Interpreter does, also when the program raises.
+
+    Generated code only runs from the start of the program. A run with max_cycles runs code
+    generated with cycle limits, the first time one is given, and stops at a closing bracket;
+    resuming it, or a run from a snapshot, goes on in Interpreter's loop.
+    """
+
+    # Generated code only runs from the start of the program, so it has no use for a prefix.
+    prefix_cycles = 0
+
+    def __init__(self, source="", memsize=30000, output=None, input=None, cache=None, generator=None):
+        self.generator = generator or CodeGenerator()
+        self.code = None
+        self.charges = None
+        self.limited = None
+        super().__init__(source, memsize, output, input, cache)
+
+    def _options(self):
+        return super()._options() + (self.generator.max_depth, self.generator.max_lines)
+
+    def _compile(self, source):
+        tree = self.compiler.build(source)
+        program = Program(source, self.compiler.flatten(tree), self.compiler.removed)
+        source = self.generator.generate(tree)
+        return program, compile(source, '<brainfuck>', 'exec'), self.generator.charges(source)
+
+    def _install(self, compiled):
+        self.program, self.code, self.charges = compiled
+        self.limited = None
+
+    def _execute(self, limit=None):
+        # Generated code runs the program from the start.
+        if self.iptr != 0 or self.input.blocking:
+            return super()._execute(limit)
+        code, charges = self.code, self.charges
+        if limit is not None:
+            if self.limited is None:
+                source = self.generator.generate(self.compiler.unflatten(self.program.ops), limited=True)
+                self.limited = compile(source, '<brainfuck>', 'exec'), self.generator.charges(source)
+            code, charges = self.limited
+        namespace = {}
+        exec(code, namespace)
+        tape = self.memory
+        tape.reserve(self.dptr, self.program.reach)
+        output = self.output
+        main = namespace['factory'](tape.cells, output.buffer, output.chunk_size, output.newline,
+                                    output.flush, self.input.read, tape.scan, tape.reserve, trips, self.program.reach,
+                                    limit, Stopped)
+        try:
+            self.dptr, self.cycles = main(self.dptr, self.cycles)
+        except Stopped as stop:
+            self.iptr, self.dptr, self.cycles = stop.args
+            return False
+        except BaseException as e:
+            state = recover(e, {'<brainfuck>': charges})
+            if state is not None:
+                self.dptr, self.cycles = state
+            if isinstance(e, IndexError) and not isinstance(e, TapeError):
+                raise TapeError(f"Data pointer moved past the end of the tape, which has {tape.size} cells") from e
+            raise
+        self.iptr = len(self.program.ops)
+        return True
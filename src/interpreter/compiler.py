@@ -0,0 +1,495 @@
+import functools
+from collections import Counter, namedtuple
+
+
+# Operation codes of the intermediate representation.
+ADD = 0
+MOVE = 1
+JUMP_IF_ZERO = 2
+JUMP_IF_NONZERO = 3
+OUTPUT = 4
+INPUT = 5
+LOOP = 6  # Only present in the tree form, flattened into a pair of jumps.
+CLEAR = 7
+MULTIPLY = 8
+SCAN = 9
+ADD_AT = 10
+OUTPUT_AT = 11
+INPUT_AT = 12
+
+OPNAMES = {
+    ADD: 'ADD',
+    MOVE: 'MOVE',
+    JUMP_IF_ZERO: 'JUMP_IF_ZERO',
+    JUMP_IF_NONZERO: 'JUMP_IF_NONZERO',
+    OUTPUT: 'OUTPUT',
+    INPUT: 'INPUT',
+    LOOP: 'LOOP',
+    CLEAR: 'CLEAR',
+    MULTIPLY: 'MULTIPLY',
+    SCAN: 'SCAN',
+    ADD_AT: 'ADD_AT',
+    OUTPUT_AT: 'OUTPUT_AT',
+    INPUT_AT: 'INPUT_AT',
+}
+
+"""
+A single operation.
+
+code: One of the operation codes above.
+arg: The operand. Amount to add or move, the jump target, or the body of a LOOP.
+    CLEAR holds (trips, itercost), MULTIPLY holds (trips, itercost, ((offset, factor), ...))
+    and SCAN holds (stride, itercost). See Compiler.idiom(). ADD_AT holds (offset, amount),
+    OUTPUT_AT and INPUT_AT hold the offset of their cell from the data pointer. See
+    Compiler.offsets().
+cost: Number of brainfuck instructions the operation stands for. Executing the operation
+    adds this many cycles.
+pos: Offset in the source of the first instruction the operation was built from.
+carried: Tuple of Ops, with arg None, for instructions elsewhere in the source whose cost is
+    part of cost: moves folded into the operation and operations removed before it. See
+    pieces().
+"""
+Op = namedtuple('Op', ['code', 'arg', 'cost', 'pos', 'carried'], defaults=((),))
+
+
+"""
+The state a program reaches before it first reads input, run from a zeroed tape. Since it does
+not depend on input, it can be worked out once and jumped to at the start of every run.
+
+cells: The tape, without trailing zero cells.
+dptr, iptr, cycles: Where the program got to.
+output: Bytes output on the way.
+"""
+Prefix = namedtuple('Prefix', ['cells', 'dptr', 'iptr', 'cycles', 'output'])
+
+
+class Program:
+    """
+    A compiled brainfuck program. The operations are flat: every JUMP_IF_ZERO holds the
+    index of its JUMP_IF_NONZERO and vice versa, so execution continues at target + 1.
+
+    reach is the furthest any operation touches to the right of the data pointer. prefix is the
+    Prefix of the program, if it has been evaluated. removed counts what Compiler.constants()
+    removed from the program.
+    """
+
+    def __init__(self, source, ops, removed=None):
+        self.source = source
+        self.ops = ops
+        self.reach = max(self.offsets(), default=0)
+        self.prefix = None
+        self.removed = Counter() if removed is None else removed
+
+    def offsets(self):
+        """
+        :return: Generator of the offsets from the data pointer of the cells operations touch,
+            besides the cell at the data pointer.
+        """
+        for op in self.ops:
+            if op.code == ADD_AT:
+                yield op.arg[0]
+            elif op.code == OUTPUT_AT or op.code == INPUT_AT:
+                yield op.arg
+            elif op.code == MULTIPLY:
+                for offset, _ in op.arg[2]:
+                    yield offset
+
+    def __len__(self):
+        return len(self.ops)
+
+    def dump(self):
+        return '\n'.join(f"{i:>6} {OPNAMES[op.code]:<16} {op.arg}" for i, op in enumerate(self.ops))
+
+
+@functools.lru_cache(maxsize=None)
+def trips(step):
+    """
+    Builds the table of how many times a loop that adds step to its counter cell runs
+    before the counter reaches zero, indexed by the counter's starting value.
+
+    A counter starting at value reaches zero after n iterations when value + n * step is a
+    multiple of 256, so n is -value times the inverse of step, mod 256. Only odd steps have an
+    inverse. With an even step, the loop never ends for some starting values.
+
+    :param step: Amount added to the counter each iteration. Must be odd.
+    :return: Tuple of 256 trip counts.
+    """
+    inverse = pow(step, -1, 256)
+    return tuple(-value * inverse % 256 for value in range(256))
+
+
+def pieces(op):
+    """
+    Splits the cost of an operation by where in the source it comes from.
+
+    :return: Tuple of Ops, with arg None: the operation's own part, unless it costs nothing,
+        followed by what it carries.
+    """
+    own = op.cost - sum(piece.cost for piece in op.carried)
+    return ((Op(op.code, None, own, op.pos),) if own else ()) + op.carried
+
+
+def step_of(table):
+    """
+    :param table: A trip count table built by trips().
+    :return: The step the table was built for.
+    """
+    return -pow(table[1], -1, 256) % 256
+
+
+class Compiler:
+
+    def __init__(self, optimize=True):
+        self.optimize = optimize
+        self.removed = Counter()
+
+    def compile(self, source):
+        """
+        Compiles brainfuck source into a Program. Characters that are not brainfuck
+        instructions are dropped, and runs of +- and <> are folded into single operations.
+        If optimize is set, common loop idioms are replaced by single operations, operations
+        whose cell is known are simplified or removed, and straight-line code addresses cells
+        by offset with a single move at the end.
+
+        :param source: Brainfuck source code.
+        :return: The compiled Program.
+        """
+        tree = self.build(source)
+        return Program(source, self.flatten(tree), self.removed)
+
+    def build(self, source):
+        """
+        Parses and optimizes the source into a tree of operations.
+
+        :param source: Brainfuck source code.
+        :return: List of operations, with loops as LOOP operations.
+        """
+        tree = self.parse(source)
+        self.removed = Counter()
+        if self.optimize:
+            tree = self.offsets(self.constants(self.idioms(tree)))
+        return tree
+
+    def parse(self, source):
+        """
+        Parses the source into a tree of operations in which each loop is a single LOOP
+        operation holding its body.
+
+        :param source: Brainfuck source code.
+        :return: List of operations.
+        """
+        block = []
+        stack = []
+        code = None
+        for position, char in enumerate(source):
+            if char == '+' or char == '-':
+                amount = 1 if char == '+' else -1
+                if code == ADD:
+                    last = block[-1]
+                    block[-1] = Op(ADD, (last.arg + amount) % 256, last.cost + 1, last.pos)
+                else:
+                    block.append(Op(ADD, amount % 256, 1, position))
+                code = ADD
+            elif char == '>' or char == '<':
+                amount = 1 if char == '>' else -1
+                if code == MOVE:
+                    last = block[-1]
+                    block[-1] = Op(MOVE, last.arg + amount, last.cost + 1, last.pos)
+                else:
+                    block.append(Op(MOVE, amount, 1, position))
+                code = MOVE
+            elif char == '.':
+                block.append(Op(OUTPUT, None, 1, position))
+                code = OUTPUT
+            elif char == ',':
+                block.append(Op(INPUT, None, 1, position))
+                code = INPUT
+            elif char == '[':
+                stack.append((block, position))
+                block = []
+                code = None
+            elif char == ']':
+                if not stack:
+                    raise ValueError(f"Unmatched ']' at position {position}")
+                body = block
+                block, start = stack.pop()
+                block.append(Op(LOOP, body, 1, start))
+                code = None
+        if stack:
+            positions = ', '.join(str(start) for _, start in stack)
+            raise ValueError(f"Unmatched '[' at position {positions}")
+        return block
+
+    def idioms(self, tree):
+        """
+        Replaces loops that match a known idiom with a single operation:
+
+            [-] [+] [---]   CLEAR: set the cell to zero.
+            [->+>++<<]      MULTIPLY: add a multiple of the cell to other cells, then clear it.
+            [--->+<]        MULTIPLY, with the trip count worked out by trips().
+            [>] [<<]        SCAN: move by a stride until a zero cell is found.
+
+        CLEAR and MULTIPLY need the loop to change its counter by an odd amount, so that it
+        ends whatever the counter starts at. The replacements keep the loop's cycle cost. Each
+        iteration costs itercost cycles, the body plus its closing bracket.
+
+        :param tree: List of operations, as returned by parse().
+        :return: The rewritten list of operations.
+        """
+        result = []
+        for op in tree:
+            if op.code == LOOP:
+                body = self.idioms(op.arg)
+                op = self.idiom(op, body) or Op(LOOP, body, op.cost, op.pos)
+            result.append(op)
+        return result
+
+    def idiom(self, loop, body):
+        itercost = sum(op.cost for op in body) + 1
+
+        if len(body) == 1 and body[0].code == MOVE and body[0].arg != 0:
+            return Op(SCAN, (body[0].arg, itercost), loop.cost, loop.pos)
+
+        deltas = {}
+        offset = 0
+        for op in body:
+            if op.code == ADD:
+                deltas[offset] = (deltas.get(offset, 0) + op.arg) % 256
+            elif op.code == MOVE:
+                offset += op.arg
+            else:
+                return None
+        step = deltas.pop(0, 0)
+        if offset != 0 or step % 2 == 0:
+            return None
+        pairs = tuple((offset, factor) for offset, factor in sorted(deltas.items()) if factor != 0)
+        if pairs:
+            return Op(MULTIPLY, (trips(step), itercost, pairs), loop.cost, loop.pos)
+        return Op(CLEAR, (trips(step), itercost), loop.cost, loop.pos)
+
+    def constants(self, tree):
+        """
+        Tracks which cells hold a known value and simplifies the operations on them. A loop
+        leaves its cell at zero, and so do CLEAR, MULTIPLY and SCAN, so for instance
+
+            [>+<-][-]       the CLEAR never changes anything and is removed.
+            [-]++[>+<-]     the MULTIPLY runs twice and becomes ADD_AT (1, 2), ADD 254.
+
+        Loops, MULTIPLY and SCAN on a cell known to be zero are removed, CLEAR of a known cell
+        becomes an ADD, and so does MULTIPLY, one per cell. The cost of what is removed moves
+        to the next operation, which carries it, so the cycles are unchanged. Nothing is assumed about the cells
+        when the program starts, as it may run again on the tape a previous run left.
+
+        What is removed is counted in removed: 'loops' and 'clears' that are never entered,
+        operations 'folded' into additions and the brainfuck 'instructions' they stood for.
+
+        :param tree: List of operations, as returned by idioms().
+        :return: The rewritten list of operations.
+        """
+        # Position of each cell whose value is known, relative to where tree starts, to the
+        # value. base is the position of the data pointer, so that moves do not touch known.
+        known = {}
+        base = 0
+        result = []
+        pending = 0
+        carried = ()
+        for op in tree:
+            code = op.code
+            value = known.get(base)
+            if code in (LOOP, CLEAR, MULTIPLY, SCAN) and value == 0:
+                self.removed['clears' if code == CLEAR else 'loops'] += 1
+                self.removed['instructions'] += self.size(op)
+                pending += op.cost
+                carried += pieces(op)
+                continue
+            if code in (CLEAR, MULTIPLY) and value is not None:
+                self.removed['folded'] += 1
+                count = op.arg[0][value]
+                cost = pending + op.cost + count * op.arg[1]
+                carried += pieces(op._replace(cost=op.cost + count * op.arg[1]))
+                pending = 0
+                for offset, factor in op.arg[2] if code == MULTIPLY else ():
+                    if base + offset in known:
+                        known[base + offset] = (known[base + offset] + count * factor) % 256
+                    result.append(Op(MOVE, offset, cost, op.pos, carried))
+                    result.append(Op(ADD, count * factor % 256, 0, op.pos))
+                    result.append(Op(MOVE, -offset, 0, op.pos))
+                    cost = 0
+                    carried = ()
+                result.append(Op(ADD, -value % 256, cost, op.pos, carried))
+                carried = ()
+                known[base] = 0
+                continue
+            if code == ADD:
+                if value is not None:
+                    known[base] = (value + op.arg) % 256
+            elif code == MOVE:
+                base += op.arg
+            elif code == INPUT:
+                known.pop(base, None)
+            elif code == MULTIPLY:
+                for offset, _ in op.arg[2]:
+                    known.pop(base + offset, None)
+                known[base] = 0
+            elif code == CLEAR:
+                known[base] = 0
+            elif code == SCAN or code == LOOP:
+                written = self.writes(op.arg) if code == LOOP else None
+                if code == LOOP:
+                    op = op._replace(arg=self.constants(op.arg))
+                if written is None:
+                    known.clear()
+                for offset in written or ():
+                    known.pop(base + offset, None)
+                known[base] = 0
+            result.append(op._replace(cost=op.cost + pending, carried=op.carried + carried))
+            pending = 0
+            carried = ()
+        if pending and result:
+            last = result[-1]
+            result[-1] = last._replace(cost=last.cost + pending, carried=last.carried + carried)
+        elif pending:
+            result.append(Op(MOVE, 0, pending, tree[0].pos, carried))
+        return result
+
+    def writes(self, tree):
+        """
+        :param tree: List of operations.
+        :return: Set of the offsets of the cells the operations may write, or None if they may
+            end up elsewhere than they started.
+        """
+        written = set()
+        offset = 0
+        for op in tree:
+            if op.code == MOVE:
+                offset += op.arg
+            elif op.code == SCAN:
+                return None
+            elif op.code == LOOP:
+                inner = self.writes(op.arg)
+                if inner is None:
+                    return None
+                written.update(offset + cell for cell in inner)
+            elif op.code == MULTIPLY:
+                written.update(offset + cell for cell, _ in op.arg[2])
+            if op.code in (ADD, INPUT, CLEAR, MULTIPLY):
+                written.add(offset)
+        return written if offset == 0 else None
+
+    def size(self, op):
+        """
+        :return: Number of brainfuck instructions an operation was built from.
+        """
+        if op.code == LOOP:
+            return 2 + sum(self.size(inner) for inner in op.arg)
+        if op.code in (CLEAR, MULTIPLY, SCAN):
+            return op.cost + op.arg[1]
+        return op.cost
+
+    def offsets(self, tree):
+        """
+        Rewrites each straight-line stretch of +-<>., so that every operation addresses its cell
+        by offset from where the stretch starts, followed by one move by the net offset:
+
+            >>>+<<<.        ADD_AT (3, 1), OUTPUT
+            >+>++<<-        ADD_AT (1, 1), ADD_AT (2, 2), ADD 255
+
+        Additions to the same cell are merged unless the cell is read or written by I/O in
+        between. The cost of the moves is carried by the operations that follow them in the
+        stretch, and that of merged additions by the first, so the cycles of a stretch are
+        unchanged, though they are counted sooner.
+
+        :param tree: List of operations, as returned by idioms().
+        :return: The rewritten list of operations.
+        """
+        result = []
+        offset = 0
+        cost = 0
+        carried = ()
+        start = None
+        adds = {}
+        for op in tree:
+            if op.code == MOVE:
+                if start is None:
+                    start = op.pos
+                offset += op.arg
+                cost += op.cost
+                carried += pieces(op)
+                continue
+            if op.code == ADD and offset in adds:
+                last = result[adds[offset]]
+                amount = ((last.arg if last.code == ADD else last.arg[1]) + op.arg) % 256
+                arg = amount if last.code == ADD else (offset, amount)
+                result[adds[offset]] = Op(last.code, arg, last.cost + op.cost + cost, last.pos,
+                                          last.carried + carried + pieces(op))
+            elif op.code == ADD:
+                adds[offset] = len(result)
+                code, arg = (ADD, op.arg) if offset == 0 else (ADD_AT, (offset, op.arg))
+                result.append(Op(code, arg, op.cost + cost, op.pos, carried + op.carried))
+            elif op.code == OUTPUT or op.code == INPUT:
+                adds.pop(offset, None)
+                code, arg = (op.code, None) if offset == 0 else (OUTPUT_AT if op.code == OUTPUT else INPUT_AT, offset)
+                result.append(Op(code, arg, op.cost + cost, op.pos, carried + op.carried))
+            else:
+                if offset != 0:
+                    result.append(Op(MOVE, offset, cost, start, carried))
+                    cost = 0
+                    carried = ()
+                if op.code == LOOP:
+                    op = op._replace(arg=self.offsets(op.arg))
+                result.append(op._replace(cost=op.cost + cost, carried=carried + op.carried))
+                adds = {}
+                offset = 0
+                start = None
+            cost = 0
+            carried = ()
+        if offset != 0 or (cost and not result):
+            result.append(Op(MOVE, offset, cost, start, carried))
+        elif cost:
+            last = result[-1]
+            result[-1] = last._replace(cost=last.cost + cost, carried=last.carried + carried)
+        return result
+
+    def flatten(self, tree, ops=None):
+        """
+        Flattens a tree of operations, replacing every LOOP with a JUMP_IF_ZERO, its body and
+        a JUMP_IF_NONZERO that point at each other.
+
+        :param tree: List of operations, as returned by parse().
+        :param ops: List to append the flattened operations to.
+        :return: The flat list of operations.
+        """
+        if ops is None:
+            ops = []
+        for op in tree:
+            if op.code == LOOP:
+                start = len(ops)
+                ops.append(None)
+                self.flatten(op.arg, ops)
+                ops[start] = Op(JUMP_IF_ZERO, len(ops), op.cost, op.pos, op.carried)
+                ops.append(Op(JUMP_IF_NONZERO, start, 1, op.pos))
+            else:
+                ops.append(op)
+        return ops
+
+    def unflatten(self, ops, start=0, end=None):
+        """
+        Rebuilds the tree of operations that flatten() was given.
+
+        :param ops: Flat list of operations.
+        :param start: Index of the first operation.
+        :param end: Index past the last operation. Defaults to the end of ops.
+        :return: List of operations, with loops as LOOP operations.
+        """
+        if end is None:
+            end = len(ops)
+        tree = []
+        while start < end:
+            op = ops[start]
+            if op.code == JUMP_IF_ZERO:
+                tree.append(Op(LOOP, self.unflatten(ops, start + 1, op.arg), op.cost, op.pos, op.carried))
+                start = op.arg + 1
+            else:
+                tree.append(op)
+                start += 1
+        return tree
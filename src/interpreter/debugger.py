@@ -0,0 +1,307 @@
+from src.interpreter.compiler import ADD, MOVE, JUMP_IF_ZERO, JUMP_IF_NONZERO, OUTPUT, INPUT, CLEAR, MULTIPLY, SCAN, \
+    ADD_AT, OUTPUT_AT, INPUT_AT
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.tape import TapeError
+
+
+# What an operation is instrumented for.
+BREAK = 1
+WRITE = 2
+ENTER = 4
+
+
+class Hooks:
+    """
+    Callbacks and stopping points for DebugInterpreter. Callbacks receive the interpreter,
+    whose dptr, iptr and cycles are up to date when they are called.
+
+    on_step(interpreter, op): Called before every operation.
+    on_loop_enter(interpreter, position): Called when a loop is entered, with the offset of
+        its '[' in the source. Loops replaced by idioms count as entered when their cell is
+        nonzero.
+    on_cell_write(interpreter, cell, old, new): Called after a cell is written.
+    breakpoints: Source offsets to stop at, before the operation that covers them.
+    watchpoints: Cells on_cell_write is called for. None watches every cell.
+    """
+
+    def __init__(self, on_step=None, on_loop_enter=None, on_cell_write=None, breakpoints=(), watchpoints=None):
+        self.on_step = on_step
+        self.on_loop_enter = on_loop_enter
+        self.on_cell_write = on_cell_write
+        self.breakpoints = set(breakpoints)
+        self.watchpoints = None if watchpoints is None else set(watchpoints)
+
+
+class DebugInterpreter(Interpreter):
+    """
+    An Interpreter that runs through hooks. Without hooks it runs exactly as Interpreter does;
+    with them, it switches to a separate instrumented loop, so Interpreter itself never checks
+    for hooks.
+
+    Operations are instrumented when the hooks are set: only operations that may write a
+    watched cell are checked against the watchpoints, and only loops and operations covering a
+    breakpoint look for those. Which cells an operation writes is known until the program
+    reaches a loop that does not return to the cell it started on, or a SCAN; from there on,
+    every operation that writes is checked. Assign hooks again after changing them.
+
+    A run stopped at a breakpoint sets breakpoint to the offset and returns False. resume()
+    continues past it.
+    """
+
+    # Hooks see every operation, so no prefix is skipped.
+    prefix_cycles = 0
+
+    def __init__(self, source="", memsize=30000, output=None, input=None, cache=None, hooks=None):
+        self._hooks = hooks
+        self.probes = None
+        self.positions = None
+        # The data pointer when the program started, that positions are relative to.
+        self.origin = 0
+        self.breakpoint = None
+        self.paused = None
+        self.budget = None
+        super().__init__(source, memsize, output, input, cache)
+
+    @property
+    def hooks(self):
+        return self._hooks
+
+    @hooks.setter
+    def hooks(self, hooks):
+        self._hooks = hooks
+        self._instrument()
+
+    def _install(self, compiled):
+        super()._install(compiled)
+        self.positions = self._positions(self.program.ops)
+        self._instrument()
+
+    @staticmethod
+    def _positions(ops):
+        """
+        :param ops: The operations of a program.
+        :return: List of the data pointer at each operation, relative to where the program
+            started, or None where it depends on the input or the tape.
+        """
+        # Whether each loop, by the index of its JUMP_IF_ZERO, ends on the cell it started on.
+        balanced = {}
+        loops = []
+        for i, op in enumerate(ops):
+            if op.code == JUMP_IF_ZERO:
+                loops.append([i, 0, True])
+            elif op.code == JUMP_IF_NONZERO:
+                start, moved, fixed = loops.pop()
+                balanced[start] = fixed and moved == 0
+                if loops:
+                    loops[-1][1] += moved
+                    loops[-1][2] = loops[-1][2] and balanced[start]
+            elif op.code == MOVE and loops:
+                loops[-1][1] += op.arg
+            elif op.code == SCAN and loops:
+                loops[-1][2] = False
+        positions = [None] * len(ops)
+        offset = 0
+        for i, op in enumerate(ops):
+            positions[i] = offset
+            if op.code == MOVE:
+                offset += op.arg
+            elif op.code == SCAN or (op.code == JUMP_IF_ZERO and not balanced[i]):
+                break
+        return positions
+
+    @staticmethod
+    def _writes(op):
+        """
+        :return: Offsets from the data pointer of the cells an operation may write.
+        """
+        if op.code == ADD_AT:
+            return op.arg[0],
+        if op.code == INPUT_AT:
+            return op.arg,
+        if op.code == MULTIPLY:
+            return (0,) + tuple(offset for offset, _ in op.arg[2])
+        if op.code in (ADD, INPUT, CLEAR):
+            return 0,
+        return ()
+
+    def _instrument(self):
+        """
+        Works out what each operation of the program is instrumented for.
+        """
+        hooks = self._hooks
+        if hooks is None or self.program is None:
+            self.probes = None
+            return
+        ops = self.program.ops
+        watch = hooks.watchpoints
+        probes = [0] * len(ops)
+        for i, op in enumerate(ops):
+            if hooks.on_cell_write is not None and self._writes(op):
+                position = self.positions[i]
+                if watch is None or position is None or any(self.origin + position + offset in watch
+                                                             for offset in self._writes(op)):
+                    probes[i] |= WRITE
+            if hooks.on_loop_enter is not None and op.code in (JUMP_IF_ZERO, CLEAR, MULTIPLY, SCAN):
+                probes[i] |= ENTER
+        # A breakpoint stops at the operation that covers it: the last one that starts at or
+        # before the offset. The closing jump of a loop starts at its '[', so it is skipped.
+        starts = [(op.pos, i) for i, op in enumerate(ops) if op.code != JUMP_IF_NONZERO]
+        for offset in hooks.breakpoints:
+            covering = [(pos, -i) for pos, i in starts if pos <= offset]
+            if covering:
+                probes[-max(covering)[1]] |= BREAK
+        self.probes = probes
+
+    def reset(self):
+        super().reset()
+        self.breakpoint = None
+        self.paused = None
+
+    def step(self, count=1):
+        """
+        Executes count operations from iptr, stopping early at breakpoints.
+
+        :param count: Number of operations.
+        :return: True if the program finished.
+        """
+        self.budget = count
+        try:
+            return self.resume()
+        finally:
+            self.budget = None
+
+    def _execute(self, limit=None):
+        if self.probes is None and self.budget is None:
+            return super()._execute(limit)
+        return self._trace(limit)
+
+    def _trace(self, limit):
+        ops = self.program.ops
+        position = self.positions[self.iptr] if self.iptr < len(ops) else None
+        if self.probes is not None and position is not None and self.origin + position != self.dptr:
+            # The program runs from somewhere else than the probes were worked out for.
+            self.origin = self.dptr - position
+            self._instrument()
+        probes = self.probes or [0] * len(ops)
+        hooks = self._hooks or Hooks()
+        on_step = hooks.on_step
+        on_loop_enter = hooks.on_loop_enter
+        on_cell_write = hooks.on_cell_write
+        watch = hooks.watchpoints
+        tape = self.memory
+        memory = tape.cells
+        output = self.output
+        read = self.input.read
+        budget = self.budget
+        end = len(ops)
+        if limit is None:
+            limit = float('inf')
+        self.waiting = False
+        self.breakpoint = None
+        paused = self.paused
+        self.paused = None
+
+        def write(cell, value):
+            old = memory[cell]
+            memory[cell] = value
+            if watch is None or cell in watch:
+                on_cell_write(self, cell, old, value)
+
+        reach = self.program.reach
+        try:
+            tape.reserve(self.dptr, reach)
+            while self.iptr < end:
+                iptr = self.iptr
+                op = ops[iptr]
+                code, arg, cost, pos, _ = op
+                probe = probes[iptr]
+                if probe & BREAK and iptr != paused:
+                    self.breakpoint = pos
+                    self.paused = iptr
+                    break
+                paused = None
+                if budget is not None:
+                    if budget == 0:
+                        break
+                    budget -= 1
+                if on_step is not None:
+                    on_step(self, op)
+                dptr = self.dptr
+                self.cycles += cost
+                if code == ADD or code == ADD_AT:
+                    cell, amount = (dptr, arg) if code == ADD else (dptr + arg[0], arg[1])
+                    if cell < 0:
+                        tape.reserve(cell)
+                    value = (memory[cell] + amount) & 255
+                    if probe & WRITE:
+                        write(cell, value)
+                    else:
+                        memory[cell] = value
+                elif code == MOVE:
+                    self.dptr = dptr = dptr + arg
+                    tape.reserve(dptr, reach)
+                elif code == JUMP_IF_ZERO:
+                    if memory[dptr] == 0:
+                        self.iptr = arg
+                    elif probe & ENTER:
+                        on_loop_enter(self, pos)
+                elif code == JUMP_IF_NONZERO:
+                    if memory[dptr] != 0:
+                        if self.cycles - cost >= limit:
+                            self.cycles -= cost
+                            break
+                        self.iptr = arg
+                elif code == CLEAR or code == MULTIPLY:
+                    value = memory[dptr]
+                    if value:
+                        if probe & ENTER:
+                            on_loop_enter(self, pos)
+                        count = arg[0][value]
+                        self.cycles += count * arg[1]
+                        if code == MULTIPLY:
+                            pairs = arg[2]
+                            if dptr + pairs[0][0] < 0:
+                                tape.reserve(dptr + pairs[0][0])
+                            for offset, factor in pairs:
+                                value = (memory[dptr + offset] + count * factor) & 255
+                                if probe & WRITE:
+                                    write(dptr + offset, value)
+                                else:
+                                    memory[dptr + offset] = value
+                        if probe & WRITE:
+                            write(dptr, 0)
+                        else:
+                            memory[dptr] = 0
+                elif code == SCAN:
+                    if memory[dptr]:
+                        if probe & ENTER:
+                            on_loop_enter(self, pos)
+                        stride, itercost = arg
+                        self.dptr = tape.scan(dptr, stride)
+                        self.cycles += (self.dptr - dptr) // stride * itercost
+                        tape.reserve(self.dptr, reach)
+                elif code == OUTPUT or code == OUTPUT_AT:
+                    cell = dptr + (arg or 0)
+                    if cell < 0:
+                        tape.reserve(cell)
+                    output.put(memory[cell])
+                elif code == INPUT or code == INPUT_AT:
+                    cell = dptr + (arg or 0)
+                    if cell < 0:
+                        tape.reserve(cell)
+                    value = read()
+                    if value is not None:
+                        if value < 0:
+                            self.cycles -= cost
+                            self.waiting = True
+                            break
+                        if probe & WRITE:
+                            write(cell, value)
+                        else:
+                            memory[cell] = value
+                self.iptr += 1
+        except TapeError:
+            raise
+        except IndexError as e:
+            raise TapeError(f"Data pointer moved past the end of the tape, which has {tape.size} cells") from e
+        return self.iptr >= end
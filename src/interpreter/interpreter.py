@@ -1,55 +1,379 @@
-import sys
+import asyncio
+
+from src.interpreter.compiler import ADD, MOVE, JUMP_IF_ZERO, JUMP_IF_NONZERO, OUTPUT, INPUT, CLEAR, MULTIPLY, SCAN, \
+    ADD_AT, OUTPUT_AT, INPUT_AT, Compiler, Prefix
+from src.interpreter.streams import InputQueue, InputSource, OutputSink
+from src.interpreter.tape import Tape, TapeError
 
 
 class Interpreter:
 
-    def __init__(self, memsize=30000):
-        self.source = ""
-        self.memory = [0 for _ in range(memsize)]
+    # Most cycles to spend evaluating the prefix of a program when it is compiled. The
+    # evaluation runs in load(), outside of any max_cycles or slice, so it is off (0) unless
+    # turned on.
+    prefix_cycles = 0
+
+    # Functions that run loops, by the index of their JUMP_IF_ZERO, or None to interpret every
+    # loop. See _execute().
+    functions = None
+
+    def __init__(self, source="", memsize=30000, output=None, input=None, cache=None):
+        """
+        :param source: Brainfuck source code.
+        :param memsize: Number of memory cells. Cells are allocated as they are reached.
+        :param output: An OutputSink, a binary writer or a callable taking bytes. Defaults to
+            stdout.
+        :param input: An InputSource, or anything an InputSource reads from. Defaults to stdin.
+        :param cache: A ProgramCache to look compiled programs up in.
+        """
+        self.source = None
+        self.cache = cache
+        self.program = None
+        self.compiler = Compiler()
+        self.memory = Tape(memsize)
         self.dptr = 0
         self.iptr = 0
-        self.openbrackets = {}
-        self.closebrackets = {}
         self.cycles = 0
+        self.waiting = False
+        self.output = None
+        self.input = None
+        self.attach(output, input)
+        self.load(source)
+
+    def attach(self, output=None, input=None):
+        """
+        Replaces the output and input.
 
+        :param output: An OutputSink, a binary writer or a callable taking bytes. Defaults to
+            stdout.
+        :param input: An InputSource, or anything an InputSource reads from. Defaults to stdin.
+        :return:
+        """
+        if output is None:
+            output = OutputSink.stdout()
+        elif not isinstance(output, OutputSink):
+            output = OutputSink(output)
+        self.output = output
+        if not isinstance(input, InputSource):
+            input = InputSource(input)
+        self.input = input
 
-    def run(self, source):
+    def reset(self):
+        """
+        Zeroes the memory and pointers, so the interpreter can run again as if it were new. Only
+        the cells that have been allocated are zeroed, and they stay allocated. The compiled
+        program is kept.
+
+        :return:
+        """
+        self.memory.clear()
+        self.dptr = 0
+        self.iptr = 0
+        self.cycles = 0
+        self.waiting = False
+
+    def load(self, source):
+        """
+        Compiles the source. Loading the source that is already loaded is a noop, so the
+        compiled program is reused across runs.
+
+        :param source: Brainfuck source code.
+        :return:
+        """
+        if source == self.source:
+            return
+        if self.cache is None:
+            compiled = self._compile(source)
+        else:
+            compiled = self.cache.fetch(source, self._options(), self._compile)
+        self._install(compiled)
         self.source = source
-        while self.iptr < len(self.source):
-            op = self.source[self.iptr]
-            if op == '[':
-                if self.memory[self.dptr] == 0:
-                    self._jump()
-            elif op == ']':
-                if self.memory[self.dptr] != 0:
-                    self._jump()
-            elif op == '+':
-                self.memory[self.dptr] = (self.memory[self.dptr] + 1) % 256
-            elif op == '-':
-                self.memory[self.dptr] = (self.memory[self.dptr] - 1) % 256
-            elif op == '>':
-                self.dptr += 1
-            elif op == '<':
-                self.dptr -= 1
-            elif op == '.':
-                print(chr(self.memory[self.dptr]), flush=True, end='')
-            elif op == ',':
-                self.memory[self.dptr] = ord(sys.stdin.read(1))
-            self.iptr += 1
-            self.cycles += 1
-        print('\n')
-
-    def _jump(self):
-        direction = 1 if self.source[self.iptr] == '[' else -1
-        bracketcounter = direction
-        self.iptr += direction
-
-        while bracketcounter != 0:
-            if self.source[self.iptr] == '[':
-                bracketcounter += 1
-            elif self.source[self.iptr] == ']':
-                bracketcounter -= 1
-
-            self.iptr += direction
-
-        self.iptr -= direction
\ No newline at end of file
+
+    def _options(self):
+        """
+        :return: Everything besides the source that the compiled program depends on.
+        """
+        return type(self).__name__, self.compiler.optimize, self.prefix_cycles, self.memory.size
+
+    def _compile(self, source):
+        """
+        :return: The compiled form of the source that this engine executes.
+        """
+        program = self.compiler.compile(source)
+        if self.prefix_cycles and program.ops:
+            program.prefix = self._evaluate(program)
+        return program
+
+    def _evaluate(self, program):
+        """
+        Runs a program from a zeroed tape until it first reads input, finishes or has run
+        prefix_cycles cycles.
+
+        :param program: The compiled Program.
+        :return: The Prefix, or None if the program fails or reads input straight away.
+        """
+        scratch = Interpreter(memsize=self.memory.size, output=OutputSink(), input=InputQueue())
+        scratch._install(program)
+        try:
+            scratch.resume(self.prefix_cycles)
+        except TapeError:
+            return None
+        if scratch.cycles == 0:
+            return None
+        return Prefix(bytes(scratch.memory.cells).rstrip(b'\0'), scratch.dptr, scratch.iptr, scratch.cycles,
+                      scratch.output.getvalue())
+
+    def _install(self, compiled):
+        self.program = compiled
+
+    def run(self, source=None, max_cycles=None):
+        """
+        Runs the program from the start. The memory and data pointer are left as they are.
+
+        :param source: Brainfuck source code. Defaults to the loaded source.
+        :param max_cycles: Stop once cycles reaches this total. See resume().
+        :return: True if the program finished, False if it was stopped.
+        """
+        if source is not None:
+            self.load(source)
+        self.start(max_cycles)
+        return self.resume(max_cycles)
+
+    def start(self, max_cycles=None):
+        """
+        Moves to the start of the program. If the tape is still zeroed, this skips to the end of
+        the program's prefix, as if it had been run.
+
+        :param max_cycles: The prefix is not skipped if it would take cycles past this.
+        :return:
+        """
+        self.iptr = 0
+        prefix = self.program.prefix
+        if prefix is None or self.dptr != 0 or any(self.memory.cells):
+            return
+        if max_cycles is not None and self.cycles + prefix.cycles > max_cycles:
+            return
+        if prefix.cells:
+            self.memory.grow(len(prefix.cells) - 1)
+            self.memory.cells[:len(prefix.cells)] = prefix.cells
+        self.dptr = prefix.dptr
+        self.iptr = prefix.iptr
+        self.cycles += prefix.cycles
+        self.output.buffer += prefix.output
+
+    def resume(self, max_cycles=None):
+        """
+        Continues running the program from iptr.
+
+        :param max_cycles: Stop once cycles reaches this total. The limit is checked each time
+            a loop jumps back, so a run may overshoot it by the cost of one pass over a loop
+            body. A stopped run can be resumed.
+        :return: True if the program finished, False if it was stopped. If it stopped to wait
+            for input from an InputQueue, waiting is set.
+        """
+        finished = False
+        try:
+            finished = self._execute(max_cycles)
+        finally:
+            if finished:
+                self.output.finish()
+            else:
+                self.output.flush()
+        return finished
+
+    async def run_async(self, source=None, slice_cycles=10000, max_cycles=None, timeout=None, reader=None,
+                        writer=None):
+        """
+        Runs the program from the start as a coroutine, yielding to the event loop every
+        slice_cycles cycles and whenever it waits for input. Cancelling the task stops the
+        program between slices and leaves it resumable.
+
+        :param source: Brainfuck source code. Defaults to the loaded source.
+        :param slice_cycles: Number of cycles to run between yields.
+        :param max_cycles: Stop once cycles reaches this total.
+        :param timeout: Raise TimeoutError once the run has taken this many seconds.
+        :param reader: An asyncio.StreamReader to read input from. Replaces the input.
+        :param writer: An asyncio.StreamWriter to write output to. Replaces the output. Drained
+            after every slice.
+        :return: True if the program finished, False if it reached max_cycles.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        if source is not None:
+            self.load(source)
+        if reader is not None:
+            self.input = InputQueue(self.input.eof)
+        if writer is not None:
+            self.output = OutputSink(writer, self.output.chunk_size)
+        self.start(max_cycles)
+        while True:
+            limit = self.cycles + slice_cycles
+            if max_cycles is not None:
+                limit = min(limit, max_cycles)
+            finished = self.resume(limit)
+            if writer is not None:
+                await writer.drain()
+            if finished:
+                return True
+            if max_cycles is not None and self.cycles >= max_cycles:
+                return False
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"Program ran out of time after {self.cycles} cycles")
+            if self.waiting and reader is not None:
+                data = await asyncio.wait_for(reader.read(self.input.blocksize), remaining)
+                if data:
+                    self.input.feed(data)
+                else:
+                    self.input.close()
+            else:
+                # Without a reader, input is fed by other tasks, so keep polling.
+                await asyncio.sleep(0.001 if self.waiting else 0)
+
+    def _execute(self, limit=None):
+        """
+        Executes the loaded program from iptr, which indexes the compiled operations,
+        until it falls off the end, cycles reaches limit or it has to wait for input.
+
+        Loops found in functions run as those. Each returns (dptr, cycles, done), and stops at
+        its closing bracket unless done. A loop that jumps back and has none is passed to
+        _hot(), which may return one.
+
+        :return: True if the program finished.
+        """
+        ops = self.program.ops
+        functions = self.functions
+        tape = self.memory
+        memory = tape.cells
+        reach = self.program.reach
+        dptr = self.dptr
+        iptr = self.iptr
+        cycles = self.cycles
+        output = self.output
+        buffer = output.buffer
+        chunk_size = output.chunk_size
+        newline = output.newline
+        read = self.input.read
+        end = len(ops)
+        if limit is None:
+            limit = float('inf')
+        self.waiting = False
+        # Every move that lands outside 0 <= dptr < top checks the bounds and allocates cells.
+        top = len(memory) - reach
+        try:
+            if not 0 <= dptr < top:
+                top = tape.reserve(dptr, reach) - reach
+            while iptr < end:
+                code, arg, cost, _, _ = ops[iptr]
+                cycles += cost
+                if code == ADD:
+                    memory[dptr] = (memory[dptr] + arg) & 255
+                elif code == MOVE:
+                    dptr += arg
+                    if not 0 <= dptr < top:
+                        top = tape.reserve(dptr, reach) - reach
+                elif code == ADD_AT:
+                    offset, amount = arg
+                    cell = dptr + offset
+                    if cell < 0:
+                        tape.reserve(cell)
+                    memory[cell] = (memory[cell] + amount) & 255
+                elif code == JUMP_IF_ZERO:
+                    if memory[dptr] == 0:
+                        iptr = arg
+                    elif functions is not None and functions.get(iptr) is not None:
+                        dptr, cycles, done = functions[iptr](dptr, cycles, limit)
+                        top = len(memory) - reach
+                        iptr = arg
+                        if not done:
+                            # Stopped at the closing bracket, which checks the limit again.
+                            continue
+                elif code == JUMP_IF_NONZERO:
+                    if memory[dptr] != 0:
+                        if cycles - cost >= limit:
+                            cycles -= cost
+                            break
+                        function = None
+                        if functions is not None:
+                            function = functions[arg] if arg in functions else self._hot(arg)
+                        if function is None:
+                            iptr = arg
+                        else:
+                            dptr, cycles, done = function(dptr, cycles, limit)
+                            top = len(memory) - reach
+                            if not done:
+                                continue
+                elif code == CLEAR:
+                    value = memory[dptr]
+                    if value:
+                        trips, itercost = arg
+                        cycles += trips[value] * itercost
+                        memory[dptr] = 0
+                elif code == MULTIPLY:
+                    value = memory[dptr]
+                    if value:
+                        trips, itercost, pairs = arg
+                        count = trips[value]
+                        cycles += count * itercost
+                        if dptr + pairs[0][0] < 0:
+                            tape.reserve(dptr + pairs[0][0])
+                        for offset, factor in pairs:
+                            memory[dptr + offset] = (memory[dptr + offset] + count * factor) & 255
+                        memory[dptr] = 0
+                elif code == SCAN:
+                    if memory[dptr]:
+                        stride, itercost = arg
+                        start = dptr
+                        dptr = tape.scan(dptr, stride)
+                        cycles += (dptr - start) // stride * itercost
+                        if not 0 <= dptr < top:
+                            top = tape.reserve(dptr, reach) - reach
+                elif code == OUTPUT:
+                    value = memory[dptr]
+                    buffer.append(value)
+                    if len(buffer) >= chunk_size or value == newline:
+                        output.flush()
+                elif code == INPUT:
+                    value = read()
+                    if value is not None:
+                        if value < 0:
+                            cycles -= cost
+                            self.waiting = True
+                            break
+                        memory[dptr] = value
+                elif code == OUTPUT_AT:
+                    if dptr + arg < 0:
+                        tape.reserve(dptr + arg)
+                    value = memory[dptr + arg]
+                    buffer.append(value)
+                    if len(buffer) >= chunk_size or value == newline:
+                        output.flush()
+                elif code == INPUT_AT:
+                    if dptr + arg < 0:
+                        tape.reserve(dptr + arg)
+                    value = read()
+                    if value is not None:
+                        if value < 0:
+                            cycles -= cost
+                            self.waiting = True
+                            break
+                        memory[dptr + arg] = value
+                iptr += 1
+        except TapeError:
+            raise
+        except IndexError as e:
+            raise TapeError(f"Data pointer moved past the end of the tape, which has {tape.size} cells") from e
+        finally:
+            self.dptr = dptr
+            self.iptr = iptr
+            self.cycles = cycles
+        return iptr >= end
+
+    def _hot(self, start):
+        """
+        Called by _execute() when the loop whose JUMP_IF_ZERO is at start jumps back and is not
+        in functions.
+
+        :return: A function to run the loop with, or None to interpret it.
+        """
+        return None
@@ -0,0 +1,137 @@
+import numpy as np
+
+from src.interpreter.compiler import ADD, MOVE, OUTPUT, INPUT, LOOP, CLEAR, MULTIPLY, SCAN, ADD_AT, OUTPUT_AT, \
+    INPUT_AT, Compiler
+from src.interpreter.tape import TapeError
+
+
+class LaneInterpreter:
+    """
+    Runs one brainfuck program over many tapes at once. Each lane has its own row of memory,
+    data pointer, cycle count, input and output, and the lanes step through the program in
+    lockstep. Every operation is a single NumPy update across the lanes that are active. A
+    loop keeps running for the lanes whose cell is nonzero while the others wait at its end,
+    so lanes may take different paths through the program. A lane whose data pointer leaves
+    the tape raises TapeError, as Interpreter does.
+    """
+
+    def __init__(self, lanes, source="", memsize=30000, inputs=None, eof=None):
+        """
+        :param lanes: Number of lanes.
+        :param source: Brainfuck source code.
+        :param memsize: Number of memory cells per lane.
+        :param inputs: One bytes object per lane, read by ','. Lanes have no input by default.
+        :param eof: Value read at end of input. None leaves the cell unchanged.
+        """
+        self.lanes = lanes
+        self.compiler = Compiler()
+        self.source = None
+        self.tree = None
+        self.memory = np.zeros((lanes, memsize), dtype=np.uint8)
+        self.dptr = np.zeros(lanes, dtype=np.int64)
+        self.cycles = np.zeros(lanes, dtype=np.int64)
+        self.output = [bytearray() for _ in range(lanes)]
+        self.eof = eof
+        inputs = inputs or [b''] * lanes
+        if len(inputs) != lanes:
+            raise ValueError(f"Expected {lanes} inputs, got {len(inputs)}")
+        self.lengths = np.array([len(data) for data in inputs], dtype=np.int64)
+        self.inputs = np.zeros((lanes, max(self.lengths, default=0) + 1), dtype=np.uint8)
+        for lane, data in enumerate(inputs):
+            self.inputs[lane, :len(data)] = np.frombuffer(bytes(data), dtype=np.uint8)
+        self.positions = np.zeros(lanes, dtype=np.int64)
+        self.load(source)
+
+    def load(self, source):
+        if source == self.source:
+            return
+        self.tree = self.compiler.build(source)
+        self.source = source
+
+    def run(self, source=None):
+        """
+        Runs the program on every lane.
+
+        :param source: Brainfuck source code. Defaults to the loaded source.
+        :return:
+        """
+        if source is not None:
+            self.load(source)
+        self._block(self.tree, np.arange(self.lanes))
+
+    def _check(self, rows, cells):
+        """
+        Raises TapeError if any lane is about to address a cell that is not on the tape.
+
+        :param rows: Indices of the active lanes.
+        :param cells: The cell each of those lanes addresses.
+        """
+        size = self.memory.shape[1]
+        outside = (cells < 0) | (cells >= size)
+        if outside.any():
+            lane = outside.argmax()
+            raise TapeError(f"Lane {rows[lane]} addressed cell {cells[lane]}, which is not on the tape of {size} cells")
+
+    def _block(self, tree, rows):
+        """
+        :param tree: List of operations.
+        :param rows: Indices of the active lanes.
+        """
+        memory = self.memory
+        dptr = self.dptr
+        for op in tree:
+            code = op.code
+            self.cycles[rows] += op.cost
+            if code == ADD:
+                memory[rows, dptr[rows]] += np.uint8(op.arg)
+            elif code == ADD_AT:
+                offset, amount = op.arg
+                self._check(rows, dptr[rows] + offset)
+                memory[rows, dptr[rows] + offset] += np.uint8(amount)
+            elif code == MOVE:
+                dptr[rows] += op.arg
+                self._check(rows, dptr[rows])
+            elif code == LOOP:
+                active = rows[memory[rows, dptr[rows]] != 0]
+                while len(active):
+                    self._block(op.arg, active)
+                    self.cycles[active] += 1
+                    active = active[memory[active, dptr[active]] != 0]
+            elif code == CLEAR:
+                table, itercost = op.arg
+                cells = dptr[rows]
+                self.cycles[rows] += np.array(table)[memory[rows, cells]] * itercost
+                memory[rows, cells] = 0
+            elif code == MULTIPLY:
+                table, itercost, pairs = op.arg
+                cells = dptr[rows]
+                counts = np.array(table)[memory[rows, cells]]
+                self.cycles[rows] += counts * itercost
+                for offset, factor in pairs:
+                    self._check(rows, cells + offset)
+                    memory[rows, cells + offset] += ((counts * factor) & 255).astype(np.uint8)
+                memory[rows, cells] = 0
+            elif code == SCAN:
+                stride, itercost = op.arg
+                active = rows[memory[rows, dptr[rows]] != 0]
+                while len(active):
+                    dptr[active] += stride
+                    self._check(active, dptr[active])
+                    self.cycles[active] += itercost
+                    active = active[memory[active, dptr[active]] != 0]
+            elif code == OUTPUT or code == OUTPUT_AT:
+                offset = op.arg or 0
+                self._check(rows, dptr[rows] + offset)
+                for lane, value in zip(rows.tolist(), memory[rows, dptr[rows] + offset].tolist()):
+                    self.output[lane].append(value)
+            elif code == INPUT or code == INPUT_AT:
+                offset = op.arg or 0
+                self._check(rows, dptr[rows] + offset)
+                positions = self.positions[rows]
+                available = positions < self.lengths[rows]
+                reading = rows[available]
+                memory[reading, dptr[reading] + offset] = self.inputs[reading, positions[available]]
+                self.positions[reading] += 1
+                if self.eof is not None:
+                    ended = rows[~available]
+                    memory[ended, dptr[ended] + offset] = self.eof
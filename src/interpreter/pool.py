@@ -0,0 +1,82 @@
+import contextlib
+import threading
+
+from src.interpreter.cache import ProgramCache
+from src.interpreter.interpreter import Interpreter
+
+
+class InterpreterPool:
+    """
+    Hands out interpreters that are reset and reused, instead of building a new one for every
+    run. A reused interpreter keeps the tape pages it has allocated and the program it last
+    compiled, and all interpreters of a pool compile through one ProgramCache, so a run of a
+    program the pool has seen before allocates next to nothing.
+
+    The pool is safe to use from several threads. Each interpreter is used by one at a time.
+    """
+
+    def __init__(self, size=0, engine=Interpreter, memsize=30000, cache=None, capacity=None):
+        """
+        :param size: Number of interpreters to build up front.
+        :param engine: Interpreter class to build.
+        :param memsize: Number of memory cells of each interpreter.
+        :param cache: ProgramCache shared by the interpreters. Defaults to a new one held in
+            memory.
+        :param capacity: Most interpreters kept idle. Interpreters released beyond it are
+            dropped. None keeps every one.
+        """
+        self.engine = engine
+        self.memsize = memsize
+        self.cache = ProgramCache() if cache is None else cache
+        self.capacity = capacity
+        self.idle = []
+        self.created = 0
+        self.lock = threading.Lock()
+        for _ in range(size):
+            self.idle.append(self._create())
+
+    def _create(self):
+        self.created += 1
+        return self.engine(memsize=self.memsize, cache=self.cache)
+
+    def acquire(self, output=None, input=None):
+        """
+        Takes an idle interpreter, building one if there is none.
+
+        :param output: Output of the interpreter, as for Interpreter.
+        :param input: Input of the interpreter, as for Interpreter.
+        :return: The interpreter, with zeroed memory.
+        """
+        with self.lock:
+            interpreter = self.idle.pop() if self.idle else None
+            if interpreter is None:
+                interpreter = self._create()
+        interpreter.attach(output, input)
+        return interpreter
+
+    def release(self, interpreter):
+        """
+        Resets an interpreter and returns it to the pool.
+
+        :param interpreter: An interpreter from acquire().
+        :return:
+        """
+        interpreter.reset()
+        with self.lock:
+            if self.capacity is None or len(self.idle) < self.capacity:
+                self.idle.append(interpreter)
+
+    @contextlib.contextmanager
+    def interpreter(self, output=None, input=None):
+        """
+        Lends an interpreter for the duration of a with block.
+
+        :param output: Output of the interpreter, as for Interpreter.
+        :param input: Input of the interpreter, as for Interpreter.
+        :return: Context manager yielding the interpreter.
+        """
+        interpreter = self.acquire(output, input)
+        try:
+            yield interpreter
+        finally:
+            self.release(interpreter)
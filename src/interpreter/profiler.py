@@ -0,0 +1,374 @@
+import argparse
+import json
+import sys
+from itertools import islice
+
+from src.interpreter.compiler import ADD, MOVE, JUMP_IF_ZERO, JUMP_IF_NONZERO, OUTPUT, INPUT, CLEAR, MULTIPLY, SCAN, \
+    ADD_AT, OUTPUT_AT, INPUT_AT, LOOP, OPNAMES, pieces
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.streams import InputSource, OutputSink
+from src.interpreter.tape import TapeError
+
+
+class Profile:
+    """
+    Execution counts of a compiled program, gathered by ProfilingInterpreter. Counts are kept
+    per operation and reported against the source offsets the operations were built from, so
+    operations folded from several instructions, and loops replaced by idioms, are reported
+    where they appear in the source. The cycles of moves and removed operations that an
+    operation carries are reported where those appear, not against the operation.
+
+    executions[i] is the number of times operation i ran. extra[i] is the cycles of CLEAR,
+    MULTIPLY and SCAN beyond their cost, and iterations[i] the number of passes over the loop
+    they replaced.
+    """
+
+    def __init__(self, program):
+        self.program = program
+        self.executions = [0] * len(program.ops)
+        self.extra = [0] * len(program.ops)
+        self.iterations = [0] * len(program.ops)
+        self.closing = self._closing(program.source)
+
+    @staticmethod
+    def _closing(source):
+        """
+        :return: Dictionary from the offset of each '[' to the offset of its ']'.
+        """
+        closing = {}
+        stack = []
+        for position, char in enumerate(source):
+            if char == '[':
+                stack.append(position)
+            elif char == ']':
+                closing[stack.pop()] = position
+        return closing
+
+    @property
+    def cycles(self):
+        return sum(self.op_cycles(i) for i in range(len(self.executions)))
+
+    def op_cycles(self, i):
+        """
+        :return: Cycles spent in operation i itself.
+        """
+        return self.executions[i] * self.program.ops[i].cost + self.extra[i]
+
+    def parts(self, i):
+        """
+        :return: List of (piece, cycles) for the pieces() of operation i.
+        """
+        op = self.program.ops[i]
+        parts = [(piece, self.executions[i] * piece.cost) for piece in pieces(op)]
+        if self.extra[i]:
+            parts[0] = (parts[0][0], parts[0][1] + self.extra[i])
+        return parts
+
+    def location(self, position):
+        """
+        :return: The line and column of a source offset, both counted from 1.
+        """
+        source = self.program.source
+        line = source.count('\n', 0, position) + 1
+        return line, position - source.rfind('\n', 0, position)
+
+    def positions(self):
+        """
+        Counts per source offset. The closing bracket of a loop is reported at its own offset.
+        Moves and removed operations that an operation carries get rows of their own, with the
+        executions of the operation that carries them.
+
+        :return: List of dictionaries with the offset, line, column, operation, instruction
+            text, executions and cycles of each piece of the source that ran, most cycles
+            first.
+        """
+        source = self.program.source
+        rows = []
+        for i in range(len(self.program.ops)):
+            if not self.executions[i]:
+                continue
+            for piece, cycles in self.parts(i):
+                position = piece.pos
+                if piece.code == JUMP_IF_NONZERO:
+                    position = self.closing[piece.pos]
+                    text = ']'
+                elif piece.code == JUMP_IF_ZERO:
+                    text = '['
+                elif piece.code in (LOOP, CLEAR, MULTIPLY, SCAN):
+                    text = source[piece.pos:self.closing[piece.pos] + 1]
+                else:
+                    commands = (source[j] for j in range(piece.pos, len(source)) if source[j] in '+-<>.,')
+                    text = ''.join(islice(commands, piece.cost))
+                line, column = self.location(position)
+                rows.append({
+                    'position': position,
+                    'line': line,
+                    'column': column,
+                    'op': OPNAMES[piece.code],
+                    'text': text,
+                    'executions': self.executions[i],
+                    'cycles': cycles,
+                })
+        rows.sort(key=lambda row: (-row['cycles'], row['position']))
+        return rows
+
+    def loops(self):
+        """
+        Counts per loop, including loops replaced by idioms. Cycles include those of nested
+        loops, but not those an opening bracket or idiom carries from before the loop.
+
+        :return: List of dictionaries with the offset, line, column, entries, iterations and
+            cycles of each loop that was reached, most cycles first.
+        """
+        ops = self.program.ops
+        rows = []
+        for i, op in enumerate(ops):
+            if not self.executions[i]:
+                continue
+            carried = self.executions[i] * sum(piece.cost for piece in op.carried)
+            if op.code == JUMP_IF_ZERO:
+                iterations = self.executions[op.arg]
+                cycles = sum(self.op_cycles(j) for j in range(i, op.arg + 1)) - carried
+            elif op.code in (CLEAR, MULTIPLY, SCAN):
+                iterations = self.iterations[i]
+                cycles = self.op_cycles(i) - carried
+            else:
+                continue
+            line, column = self.location(op.pos)
+            rows.append({
+                'position': op.pos,
+                'line': line,
+                'column': column,
+                'op': OPNAMES[op.code],
+                'entries': self.executions[i],
+                'iterations': iterations,
+                'cycles': cycles,
+            })
+        rows.sort(key=lambda row: (-row['cycles'], row['position']))
+        return rows
+
+    def histogram(self):
+        """
+        :return: Dictionary from operation name to its executions and cycles. Carried moves and
+            removed operations count under their own names.
+        """
+        histogram = {}
+        for i in range(len(self.program.ops)):
+            if not self.executions[i]:
+                continue
+            for piece, cycles in self.parts(i):
+                counts = histogram.setdefault(OPNAMES[piece.code], {'executions': 0, 'cycles': 0})
+                counts['executions'] += self.executions[i]
+                counts['cycles'] += cycles
+        return histogram
+
+    def as_dict(self):
+        return {
+            'cycles': self.cycles,
+            'positions': self.positions(),
+            'loops': self.loops(),
+            'ops': self.histogram(),
+        }
+
+    def to_json(self, **kwargs):
+        """
+        :param kwargs: Passed on to json.dumps().
+        :return: The profile as JSON.
+        """
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def report(self, limit=20):
+        """
+        :param limit: Number of rows in the position and loop tables.
+        :return: The profile as text tables, most cycles first.
+        """
+        total = self.cycles or 1
+        lines = [f"{'op':<16} {'executions':>12} {'cycles':>14} {'%':>6}"]
+        for name, counts in sorted(self.histogram().items(), key=lambda item: -item[1]['cycles']):
+            lines.append(f"{name:<16} {counts['executions']:>12} {counts['cycles']:>14} "
+                         f"{100 * counts['cycles'] / total:>6.2f}")
+        lines += ['', f"{'loop':<12} {'entries':>10} {'iterations':>12} {'cycles':>14} {'%':>6}"]
+        for row in self.loops()[:limit]:
+            where = f"{row['line']}:{row['column']}"
+            lines.append(f"{where:<12} {row['entries']:>10} {row['iterations']:>12} {row['cycles']:>14} "
+                         f"{100 * row['cycles'] / total:>6.2f}")
+        lines += ['', f"{'position':<12} {'executions':>12} {'cycles':>14} {'%':>6}  code"]
+        for row in self.positions()[:limit]:
+            text = row['text'] if len(row['text']) <= 20 else row['text'][:17] + '...'
+            where = f"{row['line']}:{row['column']}"
+            lines.append(f"{where:<12} {row['executions']:>12} {row['cycles']:>14} "
+                         f"{100 * row['cycles'] / total:>6.2f}  {text}")
+        return '\n'.join(lines)
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    An Interpreter that counts how often each operation runs. It is a separate engine so that
+    Interpreter itself pays nothing for profiling. The counts are in profile, which starts
+    over whenever a different program is loaded and accumulates across runs of the same one.
+    """
+
+    # Operations of a skipped prefix would go uncounted.
+    prefix_cycles = 0
+
+    def __init__(self, source="", memsize=30000, output=None, input=None, cache=None):
+        self.profile = None
+        super().__init__(source, memsize, output, input, cache)
+
+    def _install(self, compiled):
+        super()._install(compiled)
+        self.profile = Profile(self.program)
+
+    def _execute(self, limit=None):
+        ops = self.program.ops
+        tape = self.memory
+        memory = tape.cells
+        reach = self.program.reach
+        dptr = self.dptr
+        iptr = self.iptr
+        cycles = self.cycles
+        output = self.output
+        buffer = output.buffer
+        chunk_size = output.chunk_size
+        newline = output.newline
+        read = self.input.read
+        executions = self.profile.executions
+        extra = self.profile.extra
+        iterations = self.profile.iterations
+        end = len(ops)
+        if limit is None:
+            limit = float('inf')
+        self.waiting = False
+        top = len(memory) - reach
+        try:
+            if not 0 <= dptr < top:
+                top = tape.reserve(dptr, reach) - reach
+            while iptr < end:
+                code, arg, cost, _, _ = ops[iptr]
+                cycles += cost
+                executions[iptr] += 1
+                if code == ADD:
+                    memory[dptr] = (memory[dptr] + arg) & 255
+                elif code == MOVE:
+                    dptr += arg
+                    if not 0 <= dptr < top:
+                        top = tape.reserve(dptr, reach) - reach
+                elif code == ADD_AT:
+                    offset, amount = arg
+                    cell = dptr + offset
+                    if cell < 0:
+                        tape.reserve(cell)
+                    memory[cell] = (memory[cell] + amount) & 255
+                elif code == JUMP_IF_ZERO:
+                    if memory[dptr] == 0:
+                        iptr = arg
+                elif code == JUMP_IF_NONZERO:
+                    if memory[dptr] != 0:
+                        if cycles - cost >= limit:
+                            cycles -= cost
+                            executions[iptr] -= 1
+                            break
+                        iptr = arg
+                elif code == CLEAR:
+                    value = memory[dptr]
+                    if value:
+                        trips, itercost = arg
+                        iterations[iptr] += trips[value]
+                        extra[iptr] += trips[value] * itercost
+                        cycles += trips[value] * itercost
+                        memory[dptr] = 0
+                elif code == MULTIPLY:
+                    value = memory[dptr]
+                    if value:
+                        trips, itercost, pairs = arg
+                        count = trips[value]
+                        iterations[iptr] += count
+                        extra[iptr] += count * itercost
+                        cycles += count * itercost
+                        if dptr + pairs[0][0] < 0:
+                            tape.reserve(dptr + pairs[0][0])
+                        for offset, factor in pairs:
+                            memory[dptr + offset] = (memory[dptr + offset] + count * factor) & 255
+                        memory[dptr] = 0
+                elif code == SCAN:
+                    if memory[dptr]:
+                        stride, itercost = arg
+                        start = dptr
+                        dptr = tape.scan(dptr, stride)
+                        count = (dptr - start) // stride
+                        iterations[iptr] += count
+                        extra[iptr] += count * itercost
+                        cycles += count * itercost
+                        if not 0 <= dptr < top:
+                            top = tape.reserve(dptr, reach) - reach
+                elif code == OUTPUT:
+                    value = memory[dptr]
+                    buffer.append(value)
+                    if len(buffer) >= chunk_size or value == newline:
+                        output.flush()
+                elif code == INPUT:
+                    value = read()
+                    if value is not None:
+                        if value < 0:
+                            cycles -= cost
+                            executions[iptr] -= 1
+                            self.waiting = True
+                            break
+                        memory[dptr] = value
+                elif code == OUTPUT_AT:
+                    if dptr + arg < 0:
+                        tape.reserve(dptr + arg)
+                    value = memory[dptr + arg]
+                    buffer.append(value)
+                    if len(buffer) >= chunk_size or value == newline:
+                        output.flush()
+                elif code == INPUT_AT:
+                    if dptr + arg < 0:
+                        tape.reserve(dptr + arg)
+                    value = read()
+                    if value is not None:
+                        if value < 0:
+                            cycles -= cost
+                            executions[iptr] -= 1
+                            self.waiting = True
+                            break
+                        memory[dptr + arg] = value
+                iptr += 1
+        except TapeError:
+            raise
+        except IndexError as e:
+            raise TapeError(f"Data pointer moved past the end of the tape, which has {tape.size} cells") from e
+        finally:
+            self.dptr = dptr
+            self.iptr = iptr
+            self.cycles = cycles
+        return iptr >= end
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs a program and prints where it spent its cycles.")
+    parser.add_argument('program', help="Brainfuck source file")
+    parser.add_argument('-i', '--input', default=None, help="Input file. Defaults to no input")
+    parser.add_argument('-m', '--memsize', type=int, default=30000)
+    parser.add_argument('-n', '--limit', type=int, default=20, help="Number of rows per table")
+    parser.add_argument('--no-optimize', action='store_true', help="Profile without replacing loop idioms")
+    parser.add_argument('--json', action='store_true', help="Print the profile as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.program) as file:
+        source = file.read()
+    data = b''
+    if args.input is not None:
+        with open(args.input, 'rb') as file:
+            data = file.read()
+    interpreter = ProfilingInterpreter(memsize=args.memsize, output=OutputSink(), input=InputSource(data, eof=0))
+    interpreter.compiler.optimize = not args.no_optimize
+    interpreter.run(source)
+    if args.json:
+        print(interpreter.profile.to_json(indent=2))
+    else:
+        print(interpreter.profile.report(args.limit))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
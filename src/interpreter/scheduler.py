@@ -0,0 +1,299 @@
+import heapq
+import itertools
+import time
+from collections import Counter, deque
+
+from src.interpreter.cache import ProgramCache
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.pool import InterpreterPool
+from src.interpreter.streams import InputQueue, OutputSink
+
+
+# States of a Task.
+READY = 'ready'
+PARKED = 'parked'
+THROTTLED = 'throttled'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+ROUND_ROBIN = 'round-robin'
+WEIGHTED = 'weighted'
+
+
+class Task:
+    """
+    A program run by a Scheduler. The interpreter holds its state between slices.
+
+    state: READY to run, PARKED waiting for input, THROTTLED because its tenant used up its
+        quota, FINISHED, or FAILED with the exception in error.
+    cycles: Cycles the task has run, as interpreter.cycles.
+    slices: Number of slices the task has run.
+    """
+
+    def __init__(self, scheduler, number, interpreter, tenant, weight):
+        self.scheduler = scheduler
+        self.number = number
+        self.interpreter = interpreter
+        self.tenant = tenant
+        self.weight = weight
+        self.state = READY
+        self.error = None
+        self.slices = 0
+        # Cycles run divided by weight. The weighted policy runs the task with the least.
+        self.share = 0.0
+
+    @property
+    def cycles(self):
+        return self.interpreter.cycles
+
+    @property
+    def input(self):
+        return self.interpreter.input
+
+    @property
+    def output(self):
+        return self.interpreter.output
+
+    def feed(self, data):
+        """
+        Feeds input to the task and wakes it if it is parked.
+
+        :param data: Bytes of input.
+        :return:
+        """
+        self.input.feed(data)
+        self.scheduler.wake(self)
+
+    def close(self):
+        """
+        Ends the task's input and wakes it if it is parked.
+
+        :return:
+        """
+        self.input.close()
+        self.scheduler.wake(self)
+
+    def __repr__(self):
+        return f'<Task {self.number} {self.state} tenant={self.tenant!r} cycles={self.cycles}>'
+
+
+class Scheduler:
+    """
+    Runs many programs in one thread, each for a slice of cycles at a time, see
+    Interpreter.resume(). A program that waits for input is parked, and runs again once its
+    input has something to read. A tenant whose programs have run its quota of cycles is
+    throttled until the quota is raised. Quotas are checked between slices, and like
+    max_cycles may be overshot by one pass over a loop body.
+
+    The round-robin policy runs ready tasks in turn. The weighted policy runs the task that has
+    run the fewest cycles for its weight, so a task of weight 2 gets twice the cycles of a task
+    of weight 1 while both are ready.
+
+    Interpreters come from an InterpreterPool and return to it when their task is removed.
+    """
+
+    def __init__(self, slice_cycles=10000, policy=ROUND_ROBIN, quotas=None, engine=Interpreter, memsize=30000,
+                 cache=None):
+        """
+        :param slice_cycles: Number of cycles each task runs before the next one is run.
+        :param policy: ROUND_ROBIN or WEIGHTED.
+        :param quotas: Dict of tenant to the most cycles its tasks may run, together.
+        :param engine: Interpreter class to run programs with.
+        :param memsize: Number of memory cells of each program.
+        :param cache: ProgramCache to compile programs through. Defaults to a new one held in
+            memory.
+        """
+        if policy not in (ROUND_ROBIN, WEIGHTED):
+            raise ValueError(f"Unknown policy {policy!r}")
+        self.slice_cycles = slice_cycles
+        self.policy = policy
+        self.quotas = dict(quotas or {})
+        self.pool = InterpreterPool(engine=engine, memsize=memsize, cache=ProgramCache() if cache is None else cache)
+        self.tasks = []
+        self.ready = deque() if policy == ROUND_ROBIN else []
+        # Dicts rather than sets, so that tasks are woken in the order they stopped.
+        self.parked = {}
+        self.throttled = {}
+        self.usage = Counter()
+        self.slices = 0
+        self.seconds = 0.0
+        self.numbers = itertools.count()
+        # Share of the task the weighted policy ran last.
+        self.clock = 0.0
+
+    def spawn(self, source, tenant=None, weight=1, input=None, output=None):
+        """
+        Adds a program, ready to run from the start.
+
+        :param source: Brainfuck source code.
+        :param tenant: Tenant the program runs for, whose quota it counts against.
+        :param weight: Share of cycles under the weighted policy.
+        :param input: Input of the program, as for Interpreter. Defaults to a new InputQueue.
+        :param output: Output of the program, as for Interpreter. Defaults to a new OutputSink
+            held in memory.
+        :return: The Task.
+        """
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        interpreter = self.pool.acquire(OutputSink() if output is None else output,
+                                        InputQueue() if input is None else input)
+        task = Task(self, next(self.numbers), interpreter, tenant, weight)
+        self.tasks.append(task)
+        try:
+            interpreter.load(source)
+            interpreter.start(self._remaining(tenant))
+        except Exception as e:
+            self._fail(task, e)
+            return task
+        self.usage[tenant] += interpreter.cycles
+        self._schedule(task)
+        return task
+
+    def remove(self, task):
+        """
+        Drops a task, whatever its state, and returns its interpreter to the pool.
+
+        :param task: A Task of this scheduler.
+        :return:
+        """
+        self.tasks.remove(task)
+        if task.state == READY and self.policy == ROUND_ROBIN:
+            self.ready.remove(task)
+        elif task.state == READY:
+            self.ready[:] = [entry for entry in self.ready if entry[2] is not task]
+            heapq.heapify(self.ready)
+        self.parked.pop(task, None)
+        self.throttled.pop(task, None)
+        self.pool.release(task.interpreter)
+
+    def set_quota(self, tenant, cycles):
+        """
+        Sets the quota of a tenant, and wakes its throttled tasks if it allows them to run.
+
+        :param tenant: The tenant.
+        :param cycles: Most cycles its tasks may run, together. None removes the quota.
+        :return:
+        """
+        if cycles is None:
+            self.quotas.pop(tenant, None)
+        else:
+            self.quotas[tenant] = cycles
+        if self._remaining(tenant) != 0:
+            for task in [task for task in self.throttled if task.tenant == tenant]:
+                del self.throttled[task]
+                self._schedule(task)
+
+    def wake(self, task):
+        """
+        Makes a parked task ready if its input has something to read.
+
+        :param task: A Task of this scheduler.
+        :return:
+        """
+        if task in self.parked and task.input.ready():
+            del self.parked[task]
+            self._schedule(task)
+
+    def step(self):
+        """
+        Runs the next ready task for one slice.
+
+        :return: The task that ran, or None if no task is ready.
+        """
+        if not self.ready:
+            for task in list(self.parked):
+                self.wake(task)
+            if not self.ready:
+                return None
+        if self.policy == ROUND_ROBIN:
+            task = self.ready.popleft()
+        else:
+            self.clock, _, task = heapq.heappop(self.ready)
+        interpreter = task.interpreter
+        tenant = task.tenant
+        before = interpreter.cycles
+        limit = before + self.slice_cycles
+        remaining = self._remaining(tenant)
+        if remaining is not None:
+            limit = min(limit, before + remaining)
+        started = time.perf_counter()
+        error = None
+        finished = False
+        try:
+            finished = interpreter.resume(limit)
+        except Exception as e:
+            error = e
+        self.seconds += time.perf_counter() - started
+        used = interpreter.cycles - before
+        self.slices += 1
+        self.usage[tenant] += used
+        task.slices += 1
+        task.share += used / task.weight
+        if error is not None:
+            self._fail(task, error)
+        elif finished:
+            task.state = FINISHED
+        elif interpreter.waiting:
+            task.state = PARKED
+            self.parked[task] = None
+            self.wake(task)
+        else:
+            self._schedule(task)
+        return task
+
+    def run(self, max_slices=None):
+        """
+        Runs tasks until none is ready, even after polling the parked ones for input.
+
+        :param max_slices: Stop after this many slices.
+        :return: Number of slices run.
+        """
+        count = 0
+        while max_slices is None or count < max_slices:
+            if self.step() is None:
+                break
+            count += 1
+        return count
+
+    def stats(self):
+        """
+        :return: Dict of the number of tasks in each state, the slices and cycles run and the
+            time spent running them, and the cycles run by each tenant.
+        """
+        states = Counter(task.state for task in self.tasks)
+        cycles = sum(self.usage.values())
+        return {
+            'tasks': len(self.tasks),
+            **{state: states[state] for state in (READY, PARKED, THROTTLED, FINISHED, FAILED)},
+            'slices': self.slices,
+            'cycles': cycles,
+            'seconds': self.seconds,
+            'cycles_per_second': cycles / self.seconds if self.seconds else 0.0,
+            'tenants': dict(self.usage),
+        }
+
+    def _remaining(self, tenant):
+        """
+        :return: Cycles the tenant may still run, or None if it has no quota.
+        """
+        quota = self.quotas.get(tenant)
+        if quota is None:
+            return None
+        return max(0, quota - self.usage[tenant])
+
+    def _schedule(self, task):
+        if self._remaining(task.tenant) == 0:
+            task.state = THROTTLED
+            self.throttled[task] = None
+            return
+        task.state = READY
+        if self.policy == ROUND_ROBIN:
+            self.ready.append(task)
+        else:
+            # A task that was not ready does not get to catch up on the cycles it missed.
+            task.share = max(task.share, self.clock)
+            heapq.heappush(self.ready, (task.share, task.number, task))
+
+    def _fail(self, task, error):
+        task.state = FAILED
+        task.error = error
@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+from src.interpreter.cache import ProgramCache
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.streams import InputQueue, OutputSink
+
+
+class Snapshot(namedtuple('Snapshot', ['source', 'engine', 'memsize', 'cells', 'dptr', 'iptr', 'cycles', 'output',
+                                       'finished', 'cache'])):
+    """
+    The frozen state of a program that has run part of the way, from which any number of
+    executions can be started.
+
+    source: Brainfuck source code.
+    engine: The Interpreter class that took the snapshot, and that fork() creates.
+    memsize: Number of memory cells.
+    cells: The allocated cells of the tape, as bytes.
+    dptr, iptr, cycles: Where the program stopped.
+    output: Bytes output up to that point.
+    finished: Whether the program ran to the end.
+    cache: ProgramCache holding the compiled program, so forks do not compile it again.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def take(cls, source, engine=Interpreter, memsize=30000, max_cycles=None, cache=None):
+        """
+        Runs a program until it first reads input, reaches max_cycles or finishes, and
+        snapshots it there.
+
+        :param source: Brainfuck source code.
+        :param engine: Interpreter class to run the program with.
+        :param memsize: Number of memory cells.
+        :param max_cycles: Stop once cycles reaches this total. See Interpreter.resume().
+        :param cache: ProgramCache to compile the program through. Defaults to a new one held in
+            memory.
+        :return: The Snapshot.
+        """
+        if cache is None:
+            cache = ProgramCache()
+        interpreter = engine(memsize=memsize, output=OutputSink(), input=InputQueue(), cache=cache)
+        finished = interpreter.run(source, max_cycles)
+        return cls(source, engine, memsize, bytes(interpreter.memory.cells), interpreter.dptr, interpreter.iptr,
+                   interpreter.cycles, interpreter.output.getvalue(), finished, cache)
+
+    def fork(self, input=None, output=None):
+        """
+        Starts an execution from the snapshot. The tape is copied, which only costs as much as
+        the cells the program had reached, and the snapshot's output is buffered ahead of
+        anything the execution outputs. Continue it with resume().
+
+        :param input: Input of the execution, as for Interpreter.
+        :param output: Output of the execution, as for Interpreter.
+        :return: An interpreter of type engine, stopped where the snapshot was taken.
+        """
+        interpreter = self.engine(self.source, self.memsize, output, input, cache=self.cache)
+        interpreter.memory.cells = bytearray(self.cells)
+        interpreter.dptr = self.dptr
+        interpreter.iptr = self.iptr
+        interpreter.cycles = self.cycles
+        interpreter.output.buffer += self.output
+        return interpreter
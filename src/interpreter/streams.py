@@ -0,0 +1,247 @@
+import sys
+from collections import deque
+
+
+# Returned by InputQueue.read() when no input is available yet.
+WAIT = -1
+
+
+def write_stdout(data):
+    """
+    Writes bytes to whatever sys.stdout currently is. Bytes go to the underlying binary buffer
+    when there is one, otherwise they are decoded one character per byte.
+
+    :param data: Bytes to write.
+    :return:
+    """
+    stdout = sys.stdout
+    buffer = getattr(stdout, 'buffer', None)
+    if buffer is not None:
+        stdout.flush()
+        buffer.write(data)
+        buffer.flush()
+    else:
+        stdout.write(data.decode('latin-1'))
+        stdout.flush()
+
+
+def read_stdin(size):
+    """
+    Reads whatever is available from sys.stdin, up to size bytes, without waiting for more.
+    Text streams with no binary buffer are read one character at a time.
+
+    :param size: Maximum number of bytes to read.
+    :return: Bytes or str. Empty at end of file.
+    """
+    stdin = sys.stdin
+    read1 = getattr(getattr(stdin, 'buffer', None), 'read1', None)
+    if read1 is not None:
+        return read1(size)
+    return stdin.read(1)
+
+
+class InputSource:
+    """
+    Supplies input bytes to an interpreter.
+
+    The source may be bytes, a bytearray or a memoryview, which are read in place, or a str,
+    which is encoded one byte per character. It may also be a file object, read in blocks of
+    blocksize bytes, or an iterable of such chunks. None reads from stdin.
+
+    At end of input, read() returns eof: None leaves the cell unchanged, 0 or 255 set it.
+    """
+
+    # Whether read() may return WAIT.
+    blocking = False
+
+    def __init__(self, source=None, eof=None, blocksize=65536):
+        self.eof = eof
+        self.blocksize = blocksize
+        self.block = memoryview(b'')
+        self.index = 0
+        self.offset = 0
+        if isinstance(source, (bytes, bytearray, memoryview, str)):
+            self._chunks = iter((source,))
+        elif source is None:
+            self._chunks = self._read_chunks(read_stdin)
+        elif hasattr(source, 'read'):
+            self._chunks = self._read_chunks(getattr(source, 'read1', None) or source.read)
+        else:
+            self._chunks = iter(source)
+
+    def _read_chunks(self, read):
+        while True:
+            chunk = read(self.blocksize)
+            if not chunk:
+                return
+            yield chunk
+
+    @property
+    def position(self):
+        """
+        :return: Number of bytes read so far.
+        """
+        return self.offset + self.index
+
+    def read(self):
+        """
+        :return: The next byte, or eof at the end of input.
+        """
+        if self.index >= len(self.block) and not self._refill():
+            return self._end()
+        value = self.block[self.index]
+        self.index += 1
+        return value
+
+    def skip(self, count):
+        """
+        Discards input, as if it had been read.
+
+        :param count: Number of bytes to discard.
+        :return: Number of bytes discarded, fewer than count if the input ran out.
+        """
+        skipped = 0
+        while skipped < count:
+            if self.index >= len(self.block) and not self._refill():
+                break
+            step = min(count - skipped, len(self.block) - self.index)
+            self.index += step
+            skipped += step
+        return skipped
+
+    def _end(self):
+        return self.eof
+
+    def _refill(self):
+        for chunk in self._chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('latin-1')
+            chunk = memoryview(chunk).cast('B')
+            if len(chunk):
+                self.offset += len(self.block)
+                self.block = chunk
+                self.index = 0
+                return True
+        return False
+
+
+class InputQueue(InputSource):
+    """
+    Input that is pushed in as it arrives. While the queue is empty and not closed, read()
+    returns WAIT, and interpreters stop before the ',' until more is fed in.
+    """
+
+    blocking = True
+
+    def __init__(self, eof=None):
+        super().__init__(b'', eof)
+        self.queue = deque()
+        self.closed = False
+        self._chunks = self
+
+    def feed(self, data):
+        if self.closed:
+            raise ValueError("Cannot feed a closed InputQueue")
+        self.queue.append(data)
+
+    def close(self):
+        """
+        Marks the end of input. Once the queue is drained, read() returns eof.
+        """
+        self.closed = True
+
+    def ready(self):
+        """
+        :return: Whether read() would return something other than WAIT.
+        """
+        return self.closed or self.index < len(self.block) or any(len(chunk) for chunk in self.queue)
+
+    def _end(self):
+        return self.eof if self.closed else WAIT
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.queue:
+            raise StopIteration
+        return self.queue.popleft()
+
+
+class OutputLimitExceeded(Exception):
+    pass
+
+
+class OutputSink:
+    """
+    Collects output bytes and passes them on in chunks.
+
+    The target may be a binary writer (anything with a write method), a callable that takes
+    bytes, or None to keep all output in memory for getvalue(). Buffered bytes are passed on
+    once chunk_size bytes have built up, after a newline if flush_on_newline is set, and at the
+    end of every run, after the trailer.
+
+    If max_bytes is set, OutputLimitExceeded is raised by the flush that takes the total past
+    it. Only the first max_bytes bytes are passed on.
+    """
+
+    def __init__(self, target=None, chunk_size=8192, flush_on_newline=False, trailer=b'', max_bytes=None):
+        self.buffer = bytearray()
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.chunk_size = chunk_size
+        self.newline = 10 if flush_on_newline else -1
+        self.trailer = trailer
+        self.captured = bytearray() if target is None else None
+        if target is None:
+            self._write = self.captured.extend
+        elif hasattr(target, 'write'):
+            self._write = target.write
+        else:
+            self._write = target
+
+    @classmethod
+    def stdout(cls):
+        """
+        :return: The default sink, which flushes to stdout on every newline and ends each run
+            with two newlines.
+        """
+        return cls(write_stdout, flush_on_newline=True, trailer=b'\n\n')
+
+    def put(self, value):
+        """
+        Buffers a single byte.
+
+        :param value: Byte value 0-255.
+        :return:
+        """
+        self.buffer.append(value)
+        if len(self.buffer) >= self.chunk_size or value == self.newline:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.written += len(data)
+        if self.max_bytes is not None and self.written > self.max_bytes:
+            self._write(data[:len(data) - (self.written - self.max_bytes)])
+            self.written = self.max_bytes
+            raise OutputLimitExceeded(f"Output exceeded {self.max_bytes} bytes")
+        self._write(data)
+
+    def finish(self):
+        """
+        Called at the end of a run. Writes the trailer and flushes.
+        """
+        self.buffer += self.trailer
+        self.flush()
+
+    def getvalue(self):
+        """
+        :return: Everything output so far, if the sink has no target.
+        """
+        if self.captured is None:
+            raise ValueError("Output was passed on to the target and not kept")
+        return bytes(self.captured + self.buffer)
@@ -0,0 +1,126 @@
+class TapeError(IndexError):
+    pass
+
+
+class Tape:
+    """
+    The memory of an interpreter. Cells are stored one byte each in a bytearray, which engines
+    index directly through the cells attribute. view() hands the cells to other code without a
+    copy. Slicing a Tape returns a list, so contents can be compared against expected lists.
+
+    The tape has size cells, but they are allocated a page at a time as the data pointer
+    reaches them, so memory use follows the highest cell touched rather than size. Cells that
+    have not been allocated read as zero.
+    """
+
+    def __init__(self, size, page_size=4096):
+        """
+        :param size: Number of cells. The tape never grows past this.
+        :param page_size: Number of cells allocated at a time.
+        """
+        self.size = size
+        self.page_size = page_size
+        self.cells = bytearray(min(size, page_size))
+
+    @property
+    def high_water(self):
+        """
+        :return: Number of cells allocated, which is the highest cell touched rounded up to a
+            whole page.
+        """
+        return len(self.cells)
+
+    def grow(self, index):
+        """
+        Allocates pages up to and including the one holding index.
+
+        :param index: Cell that must be allocated.
+        :return: Number of cells allocated.
+        """
+        if index >= len(self.cells):
+            if index >= self.size:
+                raise TapeError(f"Cell {index} is past the end of the tape, which has {self.size} cells")
+            end = min(self.size, (index // self.page_size + 1) * self.page_size)
+            self.cells.extend(bytes(end - len(self.cells)))
+        return len(self.cells)
+
+    def clear(self):
+        """
+        Zeroes the allocated cells. They stay allocated.
+        """
+        self.cells[:] = bytes(len(self.cells))
+
+    def reserve(self, dptr, reach=0):
+        """
+        Makes sure the data pointer is on the tape and that the cells up to reach past it are
+        allocated, as far as the tape goes.
+
+        :param dptr: The data pointer.
+        :param reach: Number of cells past the data pointer that operations may touch.
+        :return: Number of cells allocated.
+        """
+        if dptr < 0:
+            raise TapeError(f"Data pointer moved left of cell 0, to cell {dptr}")
+        self.grow(dptr)
+        return self.grow(min(dptr + reach, self.size - 1))
+
+    def scan(self, dptr, stride):
+        """
+        Finds the first zero cell at dptr, dptr + stride, dptr + 2 * stride and so on. Scans
+        that run past the allocated cells stop at the first unallocated cell, which is zero.
+
+        :param dptr: Cell to start at.
+        :param stride: Distance between the cells checked. Negative strides search left.
+        :return: Index of the zero cell.
+        """
+        cells = self.cells
+        try:
+            if stride == 1:
+                return cells.index(0, dptr)
+            elif stride == -1:
+                return cells.rindex(0, 0, dptr + 1)
+            return dptr + cells[dptr::stride].index(0) * stride
+        except ValueError:
+            pass
+        if stride < 0:
+            raise TapeError(f"Scan from cell {dptr} ran left of cell 0")
+        index = dptr + -(-(len(cells) - dptr) // stride) * stride
+        self.grow(index)
+        return index
+
+    def view(self):
+        """
+        :return: A memoryview over the allocated cells. The tape cannot grow while it is held.
+        """
+        return memoryview(self.cells)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        yield from self.cells
+        yield from bytes(self.size - len(self.cells))
+
+    def __getitem__(self, index):
+        cells = self.cells
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step > 0 and stop <= len(cells):
+                return list(cells[start:stop:step])
+            return [cells[i] if i < len(cells) else 0 for i in range(start, stop, step)]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise TapeError(f"Cell {index} is not on the tape")
+        return cells[index] if index < len(cells) else 0
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += self.size
+        if index < 0:
+            raise TapeError(f"Cell {index} is not on the tape")
+        self.grow(index)
+        self.cells[index] = value
+
+    def __repr__(self):
+        return f"Tape({self.size}, allocated={len(self.cells)})"
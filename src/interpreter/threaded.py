@@ -0,0 +1,249 @@
+from src.interpreter.compiler import ADD, MOVE, JUMP_IF_ZERO, JUMP_IF_NONZERO, OUTPUT, INPUT, CLEAR, MULTIPLY, SCAN, \
+    ADD_AT, OUTPUT_AT, INPUT_AT
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.tape import TapeError
+
+
+class Stop(Exception):
+    """
+    Raised by a handler to stop execution before its operation, at iptr.
+    """
+
+    def __init__(self, iptr):
+        super().__init__(iptr)
+        self.iptr = iptr
+
+
+def thread(program, tape, output, read):
+    """
+    Compiles a program into threaded code: one closure per operation, with its operand and
+    jump target bound in. Each closure executes its operation and returns the index of the
+    next one to run. The data pointer and cycle count live in closure cells shared by all
+    the handlers.
+
+    :param program: The compiled Program.
+    :param tape: The Tape the handlers work on.
+    :param output: The OutputSink the handlers write to.
+    :param read: Function returning the next input byte, as InputSource.read().
+    :return: Tuple of the handlers, a function enter(dptr, cycles, limit) that sets the
+        state, and a function leave() that returns (dptr, cycles).
+    """
+    memory = tape.cells
+    reserve = tape.reserve
+    scan = tape.scan
+    buffer = output.buffer
+    chunk_size = output.chunk_size
+    newline = output.newline
+    flush = output.flush
+    reach = program.reach
+    dptr = 0
+    cycles = 0
+    limit = 0
+    top = 0
+
+    def enter(start, count, stop):
+        nonlocal dptr, cycles, limit, top
+        dptr = start
+        cycles = count
+        limit = stop
+        top = len(memory) - reach
+        if not 0 <= dptr < top:
+            top = reserve(dptr, reach) - reach
+
+    def leave():
+        return dptr, cycles
+
+    def make_add(amount, cost, following):
+        def add():
+            nonlocal cycles
+            cycles += cost
+            memory[dptr] = (memory[dptr] + amount) & 255
+            return following
+        return add
+
+    def make_add_at(offset, amount, cost, following):
+        def add_at():
+            nonlocal cycles
+            cycles += cost
+            cell = dptr + offset
+            if cell < 0:
+                reserve(cell)
+            memory[cell] = (memory[cell] + amount) & 255
+            return following
+        return add_at
+
+    def make_move(amount, cost, following):
+        def move():
+            nonlocal dptr, cycles, top
+            cycles += cost
+            dptr += amount
+            if not 0 <= dptr < top:
+                top = reserve(dptr, reach) - reach
+            return following
+        return move
+
+    def make_jump_if_zero(cost, target, following):
+        def jump_if_zero():
+            nonlocal cycles
+            cycles += cost
+            if memory[dptr] == 0:
+                return target
+            return following
+        return jump_if_zero
+
+    def make_jump_if_nonzero(index, cost, target, following):
+        def jump_if_nonzero():
+            nonlocal cycles
+            cycles += cost
+            if memory[dptr] != 0:
+                if cycles - cost >= limit:
+                    cycles -= cost
+                    raise Stop(index)
+                return target
+            return following
+        return jump_if_nonzero
+
+    def make_clear(trips, itercost, cost, following):
+        def clear():
+            nonlocal cycles
+            cycles += cost
+            value = memory[dptr]
+            if value:
+                cycles += trips[value] * itercost
+                memory[dptr] = 0
+            return following
+        return clear
+
+    def make_multiply(trips, itercost, pairs, cost, following):
+        lowest = pairs[0][0]
+
+        def multiply():
+            nonlocal cycles
+            cycles += cost
+            value = memory[dptr]
+            if value:
+                count = trips[value]
+                cycles += count * itercost
+                if dptr + lowest < 0:
+                    reserve(dptr + lowest)
+                for offset, factor in pairs:
+                    memory[dptr + offset] = (memory[dptr + offset] + count * factor) & 255
+                memory[dptr] = 0
+            return following
+        return multiply
+
+    def make_scan(stride, itercost, cost, following):
+        def scan_():
+            nonlocal dptr, cycles, top
+            cycles += cost
+            if memory[dptr]:
+                start = dptr
+                dptr = scan(dptr, stride)
+                cycles += (dptr - start) // stride * itercost
+                if not 0 <= dptr < top:
+                    top = reserve(dptr, reach) - reach
+            return following
+        return scan_
+
+    def make_output(offset, cost, following):
+        def output_():
+            nonlocal cycles
+            cycles += cost
+            cell = dptr + offset
+            if cell < 0:
+                reserve(cell)
+            value = memory[cell]
+            buffer.append(value)
+            if len(buffer) >= chunk_size or value == newline:
+                flush()
+            return following
+        return output_
+
+    def make_input(index, offset, cost, following):
+        def input_():
+            nonlocal cycles
+            cell = dptr + offset
+            if cell < 0:
+                reserve(cell)
+            value = read()
+            if value is not None:
+                if value < 0:
+                    raise Stop(index)
+                memory[cell] = value
+            cycles += cost
+            return following
+        return input_
+
+    handlers = []
+    for index, (code, arg, cost, _, _) in enumerate(program.ops):
+        following = index + 1
+        if code == ADD:
+            handler = make_add(arg, cost, following)
+        elif code == ADD_AT:
+            handler = make_add_at(arg[0], arg[1], cost, following)
+        elif code == MOVE:
+            handler = make_move(arg, cost, following)
+        elif code == JUMP_IF_ZERO:
+            handler = make_jump_if_zero(cost, arg + 1, following)
+        elif code == JUMP_IF_NONZERO:
+            handler = make_jump_if_nonzero(index, cost, arg + 1, following)
+        elif code == CLEAR:
+            handler = make_clear(arg[0], arg[1], cost, following)
+        elif code == MULTIPLY:
+            handler = make_multiply(arg[0], arg[1], arg[2], cost, following)
+        elif code == SCAN:
+            handler = make_scan(arg[0], arg[1], cost, following)
+        elif code == OUTPUT or code == OUTPUT_AT:
+            handler = make_output(arg or 0, cost, following)
+        elif code == INPUT or code == INPUT_AT:
+            handler = make_input(index, arg or 0, cost, following)
+        else:
+            raise ValueError(f"Cannot thread operation {code}")
+        handlers.append(handler)
+    return tuple(handlers), enter, leave
+
+
+class ThreadedInterpreter(Interpreter):
+    """
+    Runs brainfuck as threaded code: the program is compiled into a list of closures, see
+    thread(), and the main loop only calls the handler at iptr. There is no dispatch on the
+    operation code, and no compiling of Python source as CodegenInterpreter does. Leaves
+    memory, dptr and cycles exactly as Interpreter does.
+
+    The handlers are bound to the tape, output and input, so they are built again whenever
+    one of those is replaced.
+    """
+
+    def __init__(self, source="", memsize=30000, output=None, input=None, cache=None):
+        self.threaded = None
+        self.bound = None
+        super().__init__(source, memsize, output, input, cache)
+
+    def _install(self, compiled):
+        super()._install(compiled)
+        self.threaded = None
+
+    def _execute(self, limit=None):
+        bound = (self.program, self.memory.cells, self.output, self.input)
+        if self.threaded is None or any(a is not b for a, b in zip(bound, self.bound)):
+            self.threaded = thread(self.program, self.memory, self.output, self.input.read)
+            self.bound = bound
+        handlers, enter, leave = self.threaded
+        end = len(handlers)
+        iptr = self.iptr
+        self.waiting = False
+        enter(self.dptr, self.cycles, float('inf') if limit is None else limit)
+        try:
+            while iptr < end:
+                iptr = handlers[iptr]()
+        except Stop as stop:
+            iptr = stop.iptr
+            self.waiting = self.program.ops[iptr].code in (INPUT, INPUT_AT)
+        except TapeError:
+            raise
+        except IndexError as e:
+            raise TapeError(f"Data pointer moved past the end of the tape, which has {self.memory.size} cells") from e
+        finally:
+            self.dptr, self.cycles = leave()
+            self.iptr = iptr
+        return iptr >= end
@@ -0,0 +1,84 @@
+from src.interpreter.codegen import CodeGenerator, recover
+from src.interpreter.compiler import INPUT, INPUT_AT, trips
+from src.interpreter.interpreter import Interpreter
+
+
+class TieredInterpreter(Interpreter):
+    """
+    Interprets a program as Interpreter does, counting how often each loop jumps back. Once a
+    loop has jumped back threshold times, it is translated into Python, inner loops included,
+    see CodeGenerator.generate_loop(), and from then on runs as that whenever it is reached,
+    as one of Interpreter's functions. Short programs never pay for generating code, and long
+    ones spend their time in it.
+
+    The compiled loops work on the same memory, dptr and cycles, and stop at max_cycles after
+    a whole iteration, so runs can be stopped and resumed as with Interpreter. When one raises,
+    dptr and cycles are left as Interpreter would leave them. A loop that reads input is not
+    compiled while the input may block. Compiled loops allocate the tape a page at a time, as
+    Interpreter does.
+    """
+
+    # Number of times a loop jumps back before it is compiled.
+    threshold = 1000
+
+    def __init__(self, source="", memsize=30000, output=None, input=None, cache=None, generator=None):
+        self.generator = generator or CodeGenerator()
+        self.counts = None
+        self.code = None
+        self.charges = None
+        self.functions = None
+        self.bound = None
+        super().__init__(source, memsize, output, input, cache)
+
+    def _install(self, compiled):
+        super()._install(compiled)
+        self.counts = [0] * len(compiled.ops)
+        self.code = {}
+        self.charges = {}
+        self.functions = {}
+
+    def _jit(self, start):
+        """
+        Compiles the loop whose JUMP_IF_ZERO is at start, unless it reads input that may block.
+
+        :param start: Index of the loop's JUMP_IF_ZERO.
+        :return: The loop's main(dptr, cycles, limit), or None.
+        """
+        ops = self.program.ops
+        end = ops[start].arg
+        function = None
+        if not self.input.blocking or not any(op.code in (INPUT, INPUT_AT) for op in ops[start:end]):
+            code = self.code.get(start)
+            if code is None:
+                loop = self.compiler.unflatten(ops, start, end + 1)[0]
+                source = self.generator.generate_loop(loop)
+                code = compile(source, f'<loop {start}>', 'exec')
+                self.code[start] = code
+                self.charges[f'<loop {start}>'] = self.generator.charges(source)
+            namespace = {}
+            exec(code, namespace)
+            tape = self.memory
+            output = self.output
+            function = namespace['factory'](tape.cells, output.buffer, output.chunk_size, output.newline,
+                                            output.flush, self.input.read, tape.scan, tape.reserve, trips,
+                                            self.program.reach)
+        self.functions[start] = function
+        return function
+
+    def _hot(self, start):
+        self.counts[start] += 1
+        return self._jit(start) if self.counts[start] >= self.threshold else None
+
+    def _execute(self, limit=None):
+        bound = (self.memory.cells, self.output, self.input)
+        if self.bound is None or any(a is not b for a, b in zip(bound, self.bound)):
+            self.functions = {}
+            self.bound = bound
+        try:
+            return super()._execute(limit)
+        except BaseException as e:
+            # A compiled loop that raises leaves dptr and cycles where it was called.
+            state = recover(e, self.charges)
+            if state is not None:
+                self.dptr, self.cycles = state
+            raise
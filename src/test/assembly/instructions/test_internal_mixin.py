@@ -1,3 +1,4 @@
+from src.interpreter.tape import TapeError
 from src.test.test_assembler import TestAssembler
 
 
@@ -38,7 +39,17 @@ class TestInternalMixin(TestAssembler):
             self.assertEqual(1000 - (case[0] * (1 if case[1] == 8 else 4)), self.interpreter.dptr)
             self.assertEqual(0, self.assembler.stack_pointer)
 
-        self.run_and_check(cases, source, check)
+        # Moving left of cell 0 is an error rather than wrapping around the tape.
+        def moves(case):
+            return case[0] * (1 if case[1] == 8 else 4)
+
+        self.run_and_check([case for case in cases if moves(case) <= 1000], source, check)
+        for case in cases:
+            if moves(case) > 1000:
+                with self.subTest(values=case):
+                    self.setUp()
+                    with self.assertRaises(TapeError):
+                        self.interpreter.run(self.assembler.assemble(source(case)))
 
     def test_add_8bit(self):
         cases = [0, 1, 5, 254, 255, 256, 3000]
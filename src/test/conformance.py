@@ -0,0 +1,73 @@
+from src.interpreter import Interpreter
+from src.interpreter.streams import InputSource, OutputLimitExceeded, OutputSink
+from src.interpreter.tape import TapeError
+
+
+class EngineConformance:
+    """
+    Tests that an engine runs programs exactly as Interpreter does. Mix into the TestCase of
+    an engine and set engine to its class.
+    """
+
+    engine = None
+
+    def create(self, **kwargs):
+        """
+        :return: A new interpreter of the engine. Override to configure it.
+        """
+        kwargs.setdefault('output', OutputSink())
+        return self.engine(**kwargs)
+
+    def assertSameRun(self, source, data=b'', **kwargs):
+        expected = Interpreter(source, output=OutputSink(), input=InputSource(data, eof=0))
+        actual = self.create(input=InputSource(data, eof=0), **kwargs)
+        expected.run()
+        actual.run(source)
+        self.assertEqual(expected.output.getvalue(), actual.output.getvalue())
+        self.assertEqual(expected.memory[:], actual.memory[:])
+        self.assertEqual(expected.dptr, actual.dptr)
+        self.assertEqual(expected.cycles, actual.cycles)
+        self.assertEqual(expected.memory.high_water, actual.memory.high_water)
+        return actual
+
+    def test_files(self):
+        # add32 works on the cell to the left of where it starts.
+        for name, data, prefix in (('HelloWorld', b'', ''), ('Count', b'', ''), ('Echo', b'echo', ''),
+                                   ('add32', b'', '>')):
+            with self.subTest(name=name):
+                with open(f'test/{name}.bf') as file:
+                    self.assertSameRun(prefix + file.read(), data)
+
+    def test_paging(self):
+        # Loops run often enough to be compiled, and move and scan past the first page.
+        self.assertSameRun("+" * 20 + "[>>>>+++[>+<-]<<<<-]" + ">" * 5000 + "+[>+<-]>[>]+")
+
+    def test_slices(self):
+        source = "+++++[>+++<-]>[>++<-]>>+>+>+<<<[>]<[<]>[-]+[+]>>+++[>+>>+<<<-]>>>.<+.,[.-]"
+        expected = Interpreter(source, output=OutputSink(), input=InputSource(b'\x20'))
+        expected.run()
+        actual = self.create(input=InputSource(b'\x20'))
+        self.assertFalse(actual.run(source, max_cycles=10))
+        while not actual.resume(actual.cycles + 10):
+            pass
+        self.assertEqual(expected.output.getvalue(), actual.output.getvalue())
+        self.assertEqual(expected.memory[:], actual.memory[:])
+        self.assertEqual((expected.dptr, expected.cycles), (actual.dptr, actual.cycles))
+
+    def test_tape_errors(self):
+        for source in ("<", "<+>", "+[<+>-]", "+[<+>-]<<", ">>>>>>>>", ">>>>>>>>+", ">>>>>.<<<<<", "+[>+]", "+[-<+]",
+                       "---[>>++++]"):
+            with self.subTest(source=source):
+                with self.assertRaises(TapeError):
+                    self.create(memsize=4).run(source)
+
+    def test_error_state(self):
+        for source, error in (("+++[>+++<-]>[>+<-]+[>+]", TapeError), ("+++[>+<-]>[.]", OutputLimitExceeded)):
+            with self.subTest(source=source):
+                expected = Interpreter(source, memsize=100, output=OutputSink(max_bytes=1000))
+                actual = self.create(memsize=100, output=OutputSink(max_bytes=1000))
+                with self.assertRaises(error):
+                    expected.run()
+                with self.assertRaises(error):
+                    actual.run(source)
+                self.assertEqual((expected.dptr, expected.cycles), (actual.dptr, actual.cycles))
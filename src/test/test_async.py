@@ -0,0 +1,76 @@
+from unittest import IsolatedAsyncioTestCase
+import asyncio
+
+from src.interpreter import Interpreter
+from src.interpreter.streams import InputQueue, OutputSink
+
+
+class TestRunAsync(IsolatedAsyncioTestCase):
+
+    async def test_yields(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        interpreter = Interpreter(output=OutputSink())
+        self.assertTrue(await interpreter.run_async("++++++++[>++++++++[>+>.<<-]<-]", slice_cycles=20))
+        task.cancel()
+        self.assertGreater(ticks, 10)
+        self.assertEqual(64, len(interpreter.output.getvalue()))
+
+    async def test_max_cycles(self):
+        interpreter = Interpreter(output=OutputSink())
+        self.assertFalse(await interpreter.run_async("+[]", slice_cycles=100, max_cycles=1000))
+        self.assertGreaterEqual(interpreter.cycles, 1000)
+        self.assertLess(interpreter.cycles, 1010)
+
+    async def test_timeout(self):
+        interpreter = Interpreter(output=OutputSink())
+        with self.assertRaises(TimeoutError):
+            await interpreter.run_async("+[]", slice_cycles=1000, timeout=0.05)
+
+    async def test_cancel(self):
+        interpreter = Interpreter(output=OutputSink())
+        task = asyncio.create_task(interpreter.run_async("+[]", slice_cycles=1000))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertFalse(interpreter.resume(interpreter.cycles + 10))
+
+    async def test_streams(self):
+        reader = asyncio.StreamReader()
+        chunks = []
+
+        class Writer:
+            def write(self, data):
+                chunks.append(data)
+
+            async def drain(self):
+                pass
+
+        async def feed():
+            for chunk in (b'ab', b'c'):
+                await asyncio.sleep(0.01)
+                reader.feed_data(chunk)
+            reader.feed_eof()
+
+        asyncio.create_task(feed())
+        interpreter = Interpreter(input=InputQueue(eof=0))
+        self.assertTrue(await interpreter.run_async(",[.,]", reader=reader, writer=Writer()))
+        self.assertEqual(b'abc', b''.join(chunks))
+
+    async def test_input_queue(self):
+        queue = InputQueue(eof=0)
+        interpreter = Interpreter(",[.,]", output=OutputSink(), input=queue)
+        self.assertFalse(interpreter.run())
+        self.assertTrue(interpreter.waiting)
+        queue.feed(b'xy')
+        queue.close()
+        self.assertTrue(interpreter.resume())
+        self.assertEqual(b'xy', interpreter.output.getvalue())
@@ -0,0 +1,56 @@
+from unittest import TestCase
+import contextlib
+import io
+import json
+
+from src.interpreter.batch import ENGINES, Job, main, run_batch, run_job
+
+
+class TestBatch(TestCase):
+
+    def test_run_job(self):
+        result = run_job(Job('echo', ",[.,]", b'abc'))
+        self.assertEqual(('echo', 'ok', b'abc'), (result.id, result.status, result.output))
+        self.assertEqual(64, len(result.digest))
+
+    def test_limits(self):
+        self.assertEqual('cycle_limit', run_job(Job(1, "+[]", max_cycles=1000)).status)
+        result = run_job(Job(2, "+[.]", max_output=10))
+        self.assertEqual(('output_limit', b'\x01' * 10), (result.status, result.output))
+
+    def test_error(self):
+        result = run_job(Job(1, "[[", b''))
+        self.assertEqual('error', result.status)
+        self.assertIn("Unmatched", result.error)
+
+    def test_pool(self):
+        jobs = [Job(i, ",[.,]", bytes([65 + i]) * i) for i in range(20)]
+        results = list(run_batch(jobs, workers=2))
+        self.assertListEqual(list(range(20)), sorted(result.id for result in results))
+        for result in results:
+            self.assertEqual(bytes([65 + result.id]) * result.id, result.output)
+
+    def test_engines_agree(self):
+        job = Job(1, "+++++[>+++++++++<-]>.", max_cycles=1000)
+        expected = run_job(job)
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(expected, next(run_batch([job], workers=0, engine=engine)))
+
+    def test_fork(self):
+        source = "++++++[>++++++++<-]>,[<+>-]<."
+        jobs = [Job(i, source, bytes([i]), max_cycles=max_cycles) for i, max_cycles in ((1, None), (2, None), (3, 10))]
+        for plain, forked in zip(run_batch(jobs, workers=0), run_batch(jobs, workers=0, fork=True)):
+            self.assertEqual(plain, forked)
+        self.assertEqual('error', run_job(Job(1, "<+", b''), fork=True).status)
+        # A program that never reads input stops at max_cycles instead of taking its snapshot.
+        self.assertEqual('cycle_limit', run_job(Job(2, "+[]", b'', max_cycles=1000), fork=True).status)
+        with self.assertWarns(RuntimeWarning):
+            self.assertEqual('ok', next(run_batch(jobs[:1], workers=0, engine='codegen', fork=True)).status)
+
+    def test_main(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            main(['test/HelloWorld.bf', '--workers', '1'])
+        result = json.loads(stdout.getvalue())
+        self.assertEqual(('ok', 'Hello, World!'), (result['status'], result['output']))
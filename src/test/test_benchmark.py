@@ -0,0 +1,67 @@
+from unittest import TestCase
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+
+from src.benchmark.corpus import Case, corpus, generated
+from src.benchmark.runner import REFERENCE, Measurement, compare, load, main, run_benchmarks, save
+from src.interpreter import Interpreter
+from src.interpreter.streams import InputSource, OutputSink
+
+
+class TestBenchmark(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_corpus(self):
+        names = [case.name for case in corpus()]
+        self.assertEqual(len(names), len(set(names)))
+        for name in ('HelloWorld.bf', 'add32.bf', 'nested-loops', 'long-scans', 'heavy-input', 'heavy-output'):
+            self.assertIn(name, names)
+
+    def test_generated(self):
+        for case in generated():
+            with self.subTest(case=case.name):
+                interpreter = Interpreter(case.source, output=OutputSink(), input=InputSource(case.input))
+                self.assertTrue(interpreter.run(max_cycles=10 ** 8))
+                self.assertGreater(interpreter.cycles, 100000)
+
+    def test_measure(self):
+        case = Case('echo', ",[.,]", b'abc\0')
+        measurements = list(run_benchmarks([case], ('interpreter', 'codegen'), warmup=0, repeat=2))
+        self.assertListEqual(['interpreter', 'codegen'], [measurement.engine for measurement in measurements])
+        self.assertEqual(1, len({measurement.digest for measurement in measurements}))
+        for measurement in measurements:
+            self.assertEqual(11, measurement.cycles)
+            self.assertLessEqual(measurement.seconds, measurement.mean)
+            self.assertGreater(measurement.peak_memory, 0)
+
+    def test_compare(self):
+        path = os.path.join(self.directory.name, 'baseline.json')
+        baseline = [Measurement('a', 'interpreter', 1.0, 1.0, 10, 10.0, 100, None),
+                    Measurement('b', 'interpreter', 1.0, 1.0, 10, 10.0, 100, None)]
+        save(path, baseline)
+        self.assertListEqual(baseline, load(path))
+        current = [baseline[0]._replace(seconds=1.05), baseline[1]._replace(seconds=1.5),
+                   baseline[1]._replace(engine='codegen')]
+        regressions = compare(current, load(path), tolerance=0.1)
+        self.assertListEqual([('b', 'interpreter', 1.0, 1.5)], regressions)
+
+    def test_main(self):
+        path = os.path.join(self.directory.name, 'results.json')
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(0, main(['-e', 'interpreter', '-k', 'Hello', '-w', '0', '-r', '1', '-o', path]))
+        self.assertIn('HelloWorld.bf', stdout.getvalue())
+        self.assertEqual(['HelloWorld.bf'], [measurement.case for measurement in load(path)])
+
+    @unittest.skipUnless(shutil.which('cc'), "No C compiler")
+    def test_reference(self):
+        case = Case('hello', "++++++++[>++++++++<-]>+.", b'')
+        interpreter, reference = run_benchmarks([case], warmup=0, repeat=1, reference=True)
+        self.assertEqual(REFERENCE, reference.engine)
+        self.assertEqual(interpreter.cycles, reference.cycles)
@@ -0,0 +1,99 @@
+from unittest import TestCase
+import unittest.mock
+import os
+import tempfile
+import threading
+
+from src.interpreter import Interpreter
+from src.interpreter.cache import ProgramCache
+from src.interpreter.codegen import CodegenInterpreter
+from src.interpreter.streams import InputSource, OutputSink
+
+
+class TestProgramCache(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def files(self):
+        return [name for name in os.listdir(self.directory.name) if name.endswith('.bfc')]
+
+    def test_memory_hit(self):
+        cache = ProgramCache()
+        first = Interpreter("+[->+<]", output=OutputSink(), cache=cache)
+        second = Interpreter("+[->+<]", output=OutputSink(), cache=cache)
+        self.assertIs(first.program, second.program)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_disk_hit(self):
+        Interpreter("+[->+<]", output=OutputSink(), cache=ProgramCache(self.directory.name))
+        cache = ProgramCache(self.directory.name)
+        interpreter = Interpreter("+[->+<]", output=OutputSink(), cache=cache)
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+        interpreter.run()
+        self.assertEqual([0, 1], interpreter.memory[0:2])
+
+    def test_prefix(self):
+        for _ in range(2):
+            interpreter = Interpreter(output=OutputSink(), cache=ProgramCache(self.directory.name))
+            interpreter.prefix_cycles = 1000
+            interpreter.load("++++++++[>++++++++<-]>+.,")
+        self.assertEqual(b'\0\x41', interpreter.program.prefix.cells)
+        interpreter.input = InputSource(b'')
+        interpreter.run()
+        self.assertEqual(b'A', interpreter.output.getvalue())
+
+    def test_options(self):
+        cache = ProgramCache(self.directory.name)
+        Interpreter("+", output=OutputSink(), cache=cache)
+        CodegenInterpreter("+", output=OutputSink(), cache=cache)
+        self.assertEqual(2, cache.misses)
+        self.assertEqual(2, len(self.files()))
+
+    def test_codegen(self):
+        CodegenInterpreter("++++++++[>++++++++<-]>+.", output=OutputSink(), cache=ProgramCache(self.directory.name))
+        interpreter = CodegenInterpreter("++++++++[>++++++++<-]>+.", output=OutputSink(),
+                                         cache=ProgramCache(self.directory.name))
+        interpreter.run()
+        self.assertEqual(b'A', interpreter.output.getvalue())
+
+    def test_eviction(self):
+        cache = ProgramCache(self.directory.name, max_bytes=0)
+        cache.put('a', 'value')
+        self.assertListEqual([], self.files())
+
+    def test_evicted_while_read(self):
+        ProgramCache(self.directory.name).put('a', 'value')
+        cache = ProgramCache(self.directory.name)
+        with unittest.mock.patch('os.utime', side_effect=FileNotFoundError):
+            self.assertEqual('value', cache.get('a'))
+
+    def test_threads(self):
+        # Few entries, so threads keep evicting what others are reading.
+        cache = ProgramCache(capacity=2)
+        errors = []
+
+        def work(n):
+            try:
+                for i in range(2000):
+                    source = '+' * ((n + i) % 5)
+                    self.assertEqual(source, cache.fetch(source, (), lambda source: source))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual([], errors)
+        self.assertEqual(8000, cache.hits + cache.misses)
+
+    def test_corrupt(self):
+        cache = ProgramCache(self.directory.name)
+        key = cache.key("+", ())
+        with open(os.path.join(self.directory.name, key + '.bfc'), 'wb') as file:
+            file.write(b'not a pickle')
+        self.assertIsNone(cache.get(key))
+        self.assertListEqual([], self.files())
@@ -0,0 +1,76 @@
+from unittest import TestCase
+import os
+import tempfile
+
+from src.interpreter import Interpreter
+from src.interpreter.checkpoint import Checkpointer
+from src.interpreter.streams import InputSource, OutputSink
+
+
+class TestCheckpointer(TestCase):
+
+    # Reads two bytes, then fills cells far apart in a slow nested loop.
+    SOURCE = ",>,<[->>" + ">" * 5000 + "+[>+<-]>[<+>-]<" + "<" * 5000 + "<<]>[.-]"
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'run.bfcp')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def interpreter(self):
+        return Interpreter(self.SOURCE, output=OutputSink(), input=InputSource(b'\x05\x03', eof=0))
+
+    def test_resume(self):
+        expected = self.interpreter()
+        expected.run()
+
+        interpreter = self.interpreter()
+        checkpointer = Checkpointer(self.path, interval=50)
+        self.assertFalse(checkpointer.run(interpreter, max_cycles=expected.cycles // 2))
+
+        # A new process picks up where the last checkpoint left off.
+        resumed = self.interpreter()
+        checkpointer = Checkpointer(self.path, interval=50)
+        self.assertTrue(checkpointer.run(resumed))
+        self.assertEqual(expected.cycles, resumed.cycles)
+        self.assertEqual(expected.memory[:], resumed.memory[:])
+        self.assertEqual(expected.dptr, resumed.dptr)
+        self.assertEqual(expected.output.getvalue(), resumed.output.getvalue())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_dirty_pages(self):
+        interpreter = Interpreter(memsize=100000, output=OutputSink())
+        interpreter.memory[9000] = 1
+        checkpointer = Checkpointer(self.path)
+        self.assertEqual(3, checkpointer.save(interpreter))
+        self.assertEqual(0, checkpointer.save(interpreter))
+        interpreter.memory[5000] = 2
+        interpreter.memory[20000] = 3
+        self.assertEqual(2, checkpointer.save(interpreter))
+        restored = Interpreter(memsize=100000, output=OutputSink())
+        self.assertTrue(Checkpointer(self.path).restore(restored))
+        self.assertEqual([2, 1, 3], [restored.memory[i] for i in (5000, 9000, 20000)])
+        self.assertEqual(interpreter.memory.high_water, restored.memory.high_water)
+
+    def test_truncated(self):
+        interpreter = self.interpreter()
+        checkpointer = Checkpointer(self.path, interval=50)
+        checkpointer.run(interpreter, max_cycles=400)
+        cycles = interpreter.cycles
+        with open(self.path, 'ab') as file:
+            file.write(b'D\xff\xff\x00\x00partial')
+        restored = self.interpreter()
+        self.assertTrue(Checkpointer(self.path).restore(restored))
+        self.assertEqual(cycles, restored.cycles)
+        self.assertEqual(interpreter.memory[:], restored.memory[:])
+        self.assertEqual(2, restored.input.position)
+
+    def test_other_program(self):
+        Checkpointer(self.path, interval=50).run(self.interpreter(), max_cycles=100)
+        with self.assertRaises(ValueError):
+            Checkpointer(self.path).restore(Interpreter("+" + self.SOURCE, output=OutputSink()))
+
+    def test_missing(self):
+        self.assertFalse(Checkpointer(self.path).restore(self.interpreter()))
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from src.assembly.assembler import Assembler
+from src.interpreter import Interpreter
+from src.interpreter.codegen import CodeGenerator, CodegenInterpreter
+from src.interpreter.streams import OutputLimitExceeded, OutputSink
+from src.test.conformance import EngineConformance
+
+
+class TestCodegenInterpreter(EngineConformance, TestCase):
+
+    engine = CodegenInterpreter
+
+    def test_idioms(self):
+        self.assertSameRun("+++++[>+++<-]>[>++<-]>>+>+>+<<<[>]<[<]>[-]+[+]>>+++[>+>>+<<<-]")
+        self.assertSameRun("+++++++[--->+>+++++<<]>[-----]>[+++>+<]")
+
+    def test_assembled(self):
+        source = Assembler().assemble("""
+            PUSH @top 7
+            PUSH @top 9
+            PLUS @top @top @top
+            PUSH @top 3
+            MULT @top @top @top
+        """)
+        self.assertSameRun(source)
+
+    def test_split(self):
+        generator = CodeGenerator(max_depth=2, max_lines=10)
+        self.assertSameRun('+' + '[>+' * 30 + '.-' + ']' * 30 + '>.' * 50, generator=generator)
+        self.assertGreater(len(generator.functions), 10)
+
+    def test_deep_nesting(self):
+        self.assertSameRun('+' + '[>+' * 100 + '-' + ']' * 100)
+
+    def test_error_state(self):
+        # Split into functions, so the state is recovered from the innermost one.
+        generator = CodeGenerator(max_depth=1, max_lines=4)
+        for source, error in (("+++[>+++<-]>[>+<-]+[>+]", IndexError), ("+++[>+<-]>[.]", OutputLimitExceeded)):
+            with self.subTest(source=source):
+                expected = Interpreter(source, memsize=100, output=OutputSink(max_bytes=1000))
+                actual = CodegenInterpreter(source, memsize=100, output=OutputSink(max_bytes=1000),
+                                            generator=generator)
+                with self.assertRaises(error):
+                    expected.run()
+                with self.assertRaises(error):
+                    actual.run()
+                self.assertEqual((expected.dptr, expected.cycles), (actual.dptr, actual.cycles))
+
+    def test_cycle_limit(self):
+        # Split into functions, so the loop stops from inside one.
+        source = "++++[>+++[>++<-]<-]>>."
+        generator = CodeGenerator(max_depth=1, max_lines=4)
+        for max_cycles in (1, 10, 30, 1000):
+            with self.subTest(max_cycles=max_cycles):
+                expected = Interpreter(source, output=OutputSink())
+                actual = CodegenInterpreter(source, output=OutputSink(), generator=generator)
+                self.assertEqual(expected.run(max_cycles=max_cycles), actual.run(max_cycles=max_cycles))
+                self.assertIsNotNone(actual.limited)
+                self.assertEqual((expected.iptr, expected.dptr, expected.cycles),
+                                 (actual.iptr, actual.dptr, actual.cycles))
+                self.assertEqual(expected.memory[:], actual.memory[:])
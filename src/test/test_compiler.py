@@ -0,0 +1,127 @@
+import gc
+import time
+from unittest import TestCase
+
+from src.interpreter.compiler import ADD, MOVE, JUMP_IF_ZERO, JUMP_IF_NONZERO, OUTPUT, INPUT, CLEAR, MULTIPLY, \
+    SCAN, ADD_AT, OUTPUT_AT, INPUT_AT, Compiler, step_of, trips
+
+
+class TestCompiler(TestCase):
+
+    def setUp(self) -> None:
+        self.compiler = Compiler(optimize=False)
+
+    def codes(self, source):
+        return [(op.code, op.arg) for op in self.compiler.compile(source).ops]
+
+    def test_fold(self):
+        self.assertListEqual([(ADD, 3), (MOVE, -2), (ADD, 255)], self.codes("++-++ <<<> -"))
+        self.assertListEqual([(ADD, 200 % 256)], self.codes('+' * 200))
+
+    def test_io(self):
+        self.assertListEqual([(INPUT, None), (OUTPUT, None)], self.codes(",."))
+
+    def test_jumps(self):
+        self.assertListEqual([
+            (JUMP_IF_ZERO, 5),
+            (ADD, 255),
+            (JUMP_IF_ZERO, 4),
+            (MOVE, 1),
+            (JUMP_IF_NONZERO, 2),
+            (JUMP_IF_NONZERO, 0),
+        ], self.codes("[-[>]]"))
+
+    def test_cost(self):
+        ops = self.compiler.compile("+ + -\n>>").ops
+        self.assertListEqual([3, 2], [op.cost for op in ops])
+        self.assertListEqual([0, 6], [op.pos for op in ops])
+
+    def test_clear(self):
+        self.compiler = Compiler()
+        self.assertListEqual([CLEAR, INPUT, CLEAR], [op.code for op in self.compiler.compile("[-],[+]").ops])
+
+    def test_multiply(self):
+        self.compiler = Compiler()
+        ops = self.compiler.compile("[<+>->>++<<]").ops
+        self.assertEqual(1, len(ops))
+        self.assertEqual(MULTIPLY, ops[0].code)
+        self.assertEqual(((-1, 1), (2, 2)), ops[0].arg[2])
+
+    def test_scan(self):
+        self.compiler = Compiler()
+        ops = self.compiler.compile("[>],[<<]").ops
+        self.assertListEqual([(SCAN, (1, 2)), (INPUT, None), (SCAN, (-2, 3))], [(op.code, op.arg) for op in ops])
+
+    def test_trips(self):
+        for amount in range(1, 256, 2):
+            table = trips(amount)
+            self.assertEqual(amount, step_of(table))
+            for value in range(256):
+                counts = [n for n in range(256) if (value + n * amount) % 256 == 0]
+                self.assertEqual(counts[0], table[value])
+
+    def test_odd_steps(self):
+        self.compiler = Compiler()
+        ops = self.compiler.compile("[--->+<],[+++]").ops
+        self.assertListEqual([MULTIPLY, INPUT, CLEAR], [op.code for op in ops])
+        self.assertEqual(253, step_of(ops[0].arg[0]))
+
+    def test_not_idiom(self):
+        self.compiler = Compiler()
+        for source in ("[->+]", "[-.]", "[--]", "[-->+<]", "[-[>]]"):
+            with self.subTest(source=source):
+                self.assertEqual(JUMP_IF_ZERO, self.compiler.compile(source).ops[0].code)
+
+    def test_offsets(self):
+        self.compiler = Compiler()
+        self.assertListEqual([(ADD_AT, (3, 1)), (OUTPUT, None)], self.codes(">>>+<<<."))
+        self.assertListEqual([(ADD_AT, (1, 1)), (ADD_AT, (2, 2)), (ADD, 255)], self.codes(">+>++<<-"))
+        self.assertListEqual([(ADD, 2), (OUTPUT_AT, 1), (ADD_AT, (1, 1)), (INPUT_AT, 1), (MOVE, 2)],
+                             self.codes("+>.+,<+>>"))
+        self.assertListEqual([(MOVE, -1), (MULTIPLY, 'pairs'), (ADD_AT, (1, 1)), (MOVE, 2)],
+                             [(code, 'pairs' if code == MULTIPLY else arg) for code, arg in self.codes("<[>+<-]>+>")])
+
+    def test_offset_costs(self):
+        self.compiler = Compiler()
+        for source in (">>>+<<<", "+>.<+>>,", "[<>]", "><", "[>+<<]>"):
+            with self.subTest(source=source):
+                ops = self.compiler.compile(source).ops
+                self.assertEqual(sum(char in '+-<>.,[' for char in source),
+                                 sum(op.cost for op in ops if op.code != JUMP_IF_NONZERO))
+        self.assertEqual(3, self.compiler.compile(">>>+<<<<-.>").reach)
+
+    def test_constants(self):
+        self.compiler = Compiler()
+        program = self.compiler.compile("[>+<-][-][>]>[-]<+++[->++<]>>,[-]<[<+>-]<[-]")
+        self.assertDictEqual({'clears': 1, 'loops': 1, 'instructions': 6, 'folded': 3}, dict(program.removed))
+        self.assertListEqual([MULTIPLY, MOVE, CLEAR, ADD_AT, ADD, INPUT_AT, MOVE, CLEAR, ADD_AT, ADD_AT, MOVE],
+                             [op.code for op in program.ops])
+
+    def test_constants_linear(self):
+        # Straight-line code that leaves a zero cell behind every few instructions, as the
+        # assembler's output does.
+        def seconds(count):
+            source = ',[-]>+[-]>' * count
+            best = float('inf')
+            gc.disable()
+            try:
+                for _ in range(3):
+                    started = time.perf_counter()
+                    Compiler().compile(source)
+                    best = min(best, time.perf_counter() - started)
+            finally:
+                gc.enable()
+            return best
+
+        # Eight times the code takes about eight times as long, rather than 64.
+        self.assertLess(seconds(4000), seconds(500) * 20)
+
+    def test_unflatten(self):
+        tree = self.compiler.build("+[->[.<]>[-]]++")
+        self.assertListEqual(tree, self.compiler.unflatten(self.compiler.flatten(tree)))
+
+    def test_unbalanced(self):
+        with self.assertRaisesRegex(ValueError, "position 1"):
+            self.compiler.compile("+]")
+        with self.assertRaisesRegex(ValueError, "position 0"):
+            self.compiler.compile("[+")
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from src.interpreter import Interpreter
+from src.interpreter.debugger import BREAK, WRITE, DebugInterpreter, Hooks
+from src.interpreter.streams import InputSource, OutputSink
+from src.test.conformance import EngineConformance
+
+
+class TestDebugger(TestCase):
+
+    SOURCE = "++++[>+++<-]>[>++<-]>.,[-]"
+
+    def debugger(self, hooks=None, source=SOURCE):
+        return DebugInterpreter(source, output=OutputSink(), input=InputSource(b'a', eof=0), hooks=hooks)
+
+    def test_same_run(self):
+        expected = Interpreter(self.SOURCE, output=OutputSink(), input=InputSource(b'a', eof=0))
+        expected.run()
+        steps = []
+        for hooks in (None, Hooks(on_step=lambda interpreter, op: steps.append(op))):
+            with self.subTest(hooks=hooks):
+                interpreter = self.debugger(hooks)
+                self.assertTrue(interpreter.run())
+                self.assertEqual(expected.cycles, interpreter.cycles)
+                self.assertEqual(expected.memory[:], interpreter.memory[:])
+                self.assertEqual(expected.output.getvalue(), interpreter.output.getvalue())
+        self.assertEqual(len(expected.program.ops), len(steps))
+
+    def test_loops(self):
+        entered = []
+        interpreter = self.debugger(Hooks(on_loop_enter=lambda interpreter, position: entered.append(position)))
+        interpreter.compiler.optimize = False
+        interpreter.load(self.SOURCE + " ")
+        interpreter.run()
+        self.assertListEqual([4, 13, 23], entered)
+
+    def test_watchpoints(self):
+        writes = []
+        hooks = Hooks(on_cell_write=lambda interpreter, *write: writes.append(write), watchpoints=[2])
+        interpreter = self.debugger(hooks)
+        interpreter.run()
+        self.assertListEqual([(2, 0, 24), (2, 24, 97), (2, 97, 0)], writes)
+        # Only the operations that can reach cell 2 are checked.
+        self.assertListEqual([0, 0, 0, WRITE, 0, WRITE, 0, WRITE], interpreter.probes)
+
+    def test_watchpoints_moved(self):
+        writes = []
+        hooks = Hooks(on_cell_write=lambda interpreter, *write: writes.append(write), watchpoints=[2])
+        interpreter = self.debugger(hooks, ">+")
+        interpreter.run()
+        self.assertListEqual([0, 0], interpreter.probes)
+        # Run again from cell 1, which the first run left the data pointer on.
+        interpreter.run()
+        self.assertListEqual([(2, 0, 1)], writes)
+        # Past a SCAN, the cell is not known.
+        interpreter = self.debugger(hooks, "+[>]+")
+        self.assertListEqual([0, 0, WRITE], interpreter.probes)
+
+    def test_breakpoints(self):
+        interpreter = self.debugger(Hooks(breakpoints=[13, 22]))
+        self.assertFalse(interpreter.run())
+        self.assertEqual((13, 1, 12), (interpreter.breakpoint, interpreter.dptr, interpreter.memory[1]))
+        self.assertFalse(interpreter.resume())
+        self.assertEqual((22, 1, 24), (interpreter.breakpoint, interpreter.dptr, interpreter.memory[2]))
+        self.assertTrue(interpreter.resume())
+        self.assertEqual(b'\x18', interpreter.output.getvalue())
+        self.assertEqual(BREAK, interpreter.probes[3])
+
+    def test_step(self):
+        interpreter = self.debugger()
+        self.assertFalse(interpreter.step())
+        self.assertEqual((1, 4, 4), (interpreter.iptr, interpreter.cycles, interpreter.memory[0]))
+        self.assertFalse(interpreter.step(2))
+        self.assertEqual((3, 1), (interpreter.iptr, interpreter.dptr))
+        self.assertTrue(interpreter.step(100))
+
+
+class TestDebugConformance(EngineConformance, TestCase):
+
+    engine = DebugInterpreter
+
+    def create(self, **kwargs):
+        # With hooks, the debugger runs its own instrumented loop.
+        return super().create(hooks=Hooks(on_step=lambda interpreter, op: None), **kwargs)
@@ -3,6 +3,8 @@ import unittest.mock
 import io
 
 from src.interpreter import Interpreter
+from src.interpreter.streams import InputSource, OutputSink
+from src.interpreter.tape import TapeError
 
 
 class TestInterpreter(TestCase):
@@ -52,7 +54,123 @@ class TestInterpreter(TestCase):
         self.assertEqual("1\n\n", output)
 
 
-    @unittest.mock.patch('sys.stdout', new_callable=io.StringIO)
-    def capturestdout(self, interpreter, source, mock_stdout):
-        interpreter.run(source)
-        return mock_stdout.getvalue()
+    def test_rerun(self):
+        interpreter = Interpreter("+[->+<]")
+        program = interpreter.program
+        self.capturestdout(interpreter)
+        self.capturestdout(interpreter, "+[->+<]")
+        self.assertIs(program, interpreter.program)
+        self.assertListEqual([0, 2], interpreter.memory[0:2])
+
+    def test_unbalanced(self):
+        with self.assertRaisesRegex(ValueError, "position 4"):
+            Interpreter("+[>]]")
+        with self.assertRaisesRegex(ValueError, "position 0, 2"):
+            Interpreter("[+[")
+
+    def test_cycles(self):
+        interpreter = Interpreter()
+        self.capturestdout(interpreter, "++ + comment\n[->+<]")
+        self.assertEqual(3 + 1 + 3 * 5, interpreter.cycles)
+
+    def test_idioms(self):
+        for source in ("+++++[>+++<-]>[>++<-]>>+>+>+<<<[>]<[<]>[-]",
+                       ">>+++[<+>>>+<<-]<[>+<-]>>>.<<[-<+>]>>+<<<[>>+.<<-<+>]",
+                       "+++++++[--->+>+++++<<]>[-----]>[+++>+<]",
+                       "++[>+<-][-]>[<]>[-]<+++[->++<]>>.[-]<[<+>-]<[-]+[->[-]<]"):
+            with self.subTest(source=source):
+                optimized = Interpreter(memsize=10)
+                plain = Interpreter(memsize=10)
+                plain.compiler.optimize = False
+                self.assertEqual(self.capturestdout(plain, source), self.capturestdout(optimized, source))
+                self.assertListEqual(plain.memory[:], optimized.memory[:])
+                self.assertEqual(plain.dptr, optimized.dptr)
+                self.assertEqual(plain.cycles, optimized.cycles)
+
+    def test_view(self):
+        interpreter = Interpreter(memsize=4)
+        self.capturestdout(interpreter, "->+")
+        view = interpreter.memory.view()
+        self.assertEqual(b'\xff\x01\x00\x00', view.tobytes())
+        view[2] = 7
+        self.assertEqual(7, interpreter.memory[2])
+        view.release()
+
+    def test_tape_errors(self):
+        for source in ("<", "+[<+>-]", ">>>>>>>>", "+[>+]", "<+>", ">>>>>+<<<<<"):
+            with self.subTest(source=source):
+                with self.assertRaises(TapeError):
+                    Interpreter(source, memsize=4, output=OutputSink()).run()
+
+    def test_output_sink(self):
+        interpreter = Interpreter(output=OutputSink())
+        interpreter.run("-.+++++++++++.")
+        self.assertEqual(b'\xff\n', interpreter.output.getvalue())
+
+    def test_echo(self):
+        data = bytes(range(1, 256)) * 100
+        interpreter = Interpreter(",[.,]", output=OutputSink(), input=InputSource(data, eof=0))
+        interpreter.run()
+        self.assertEqual(data, interpreter.output.getvalue())
+
+    def test_eof(self):
+        for eof, expected in ((None, 7), (0, 0), (255, 255)):
+            with self.subTest(eof=eof):
+                interpreter = Interpreter(output=OutputSink(), input=InputSource(b'', eof=eof))
+                interpreter.run("+++++++,")
+                self.assertEqual(expected, interpreter.memory[0])
+
+    def test_resume(self):
+        source = "++++++++[>++++++++<-]>[.-]"
+        complete = Interpreter(source, output=OutputSink())
+        complete.run()
+        interpreter = Interpreter(source, output=OutputSink())
+        self.assertFalse(interpreter.run(max_cycles=10))
+        while not interpreter.resume(interpreter.cycles + 10):
+            pass
+        self.assertEqual(complete.output.getvalue(), interpreter.output.getvalue())
+        self.assertEqual(complete.cycles, interpreter.cycles)
+
+    def test_prefix(self):
+        source = "++++++++[>++++++++<-]>+.[>+>+<<-],[>.<-]"
+        interpreter = Interpreter(output=OutputSink(), input=InputSource(b'\x03'))
+        interpreter.prefix_cycles = 1000
+        interpreter.load(source)
+        prefix = interpreter.program.prefix
+        self.assertEqual(b'\0\0\x41\x41', prefix.cells)
+        self.assertEqual((1, b'A'), (prefix.dptr, prefix.output))
+        self.assertEqual(',', source[interpreter.program.ops[prefix.iptr].pos])
+        plain = Interpreter(output=OutputSink(), input=InputSource(b'\x03'))
+        plain.compiler.optimize = False
+        plain.load(source)
+        self.assertIsNone(plain.program.prefix)
+        plain.run()
+        for _ in range(2):
+            interpreter.reset()
+            interpreter.input = InputSource(b'\x03')
+            interpreter.output = OutputSink()
+            interpreter.run()
+            self.assertEqual(plain.output.getvalue(), interpreter.output.getvalue())
+            self.assertEqual(plain.memory[0:4], interpreter.memory[0:4])
+            self.assertEqual((plain.dptr, plain.cycles), (interpreter.dptr, interpreter.cycles))
+
+    def test_prefix_skipped(self):
+        source = "+++++[>+++++[>+<-]<-],"
+        interpreter = Interpreter(output=OutputSink(), input=InputSource(b'', eof=0))
+        interpreter.prefix_cycles = 1000
+        interpreter.load(source)
+        self.assertEqual(b'\0\0\x19', interpreter.program.prefix.cells)
+        # A tape that is no longer zeroed runs the program from the start.
+        interpreter.run()
+        interpreter.input = InputSource(b'', eof=0)
+        interpreter.run()
+        self.assertEqual([0, 0, 50], interpreter.memory[0:3])
+        # So does a run that stops before the end of the prefix.
+        interpreter.reset()
+        self.assertFalse(interpreter.run(max_cycles=5))
+        self.assertLess(interpreter.cycles, interpreter.program.prefix.cycles)
+
+    def capturestdout(self, interpreter, source=None):
+        with unittest.mock.patch('sys.stdout', new_callable=io.StringIO) as mock_stdout:
+            interpreter.run(source)
+            return mock_stdout.getvalue()
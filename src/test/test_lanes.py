@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.assembly.assembler import Assembler
+from src.interpreter import Interpreter
+from src.interpreter.lanes import LaneInterpreter
+from src.interpreter.streams import InputSource, OutputSink
+from src.interpreter.tape import TapeError
+
+
+class TestLaneInterpreter(TestCase):
+
+    def test_matches_interpreter(self):
+        source = ",[>+++[>++<-]<-]>>.[<+>-]<<,."
+        inputs = [bytes([n]) + b'!' for n in (0, 1, 5, 200)] + [b'']
+        lanes = LaneInterpreter(len(inputs), source, memsize=16, inputs=inputs, eof=0)
+        lanes.run()
+        for lane, data in enumerate(inputs):
+            with self.subTest(input=data):
+                interpreter = Interpreter(source, memsize=16, output=OutputSink(), input=InputSource(data, eof=0))
+                interpreter.run()
+                self.assertListEqual(interpreter.memory[:], lanes.memory[lane].tolist())
+                self.assertEqual(interpreter.dptr, lanes.dptr[lane])
+                self.assertEqual(interpreter.cycles, lanes.cycles[lane])
+                self.assertEqual(interpreter.output.getvalue(), bytes(lanes.output[lane]))
+
+    def test_scan(self):
+        lanes = LaneInterpreter(3, memsize=8)
+        lanes.memory[0, :2] = 1
+        lanes.memory[1, :5] = 1
+        lanes.run("[>]")
+        self.assertListEqual([2, 5, 0], lanes.dptr.tolist())
+
+    def test_tape_errors(self):
+        for source in ("<+++", ">>>>>>>>", "+[>+]", "<.", ">>>>>>>+[-<+>>+<]"):
+            with self.subTest(source=source):
+                with self.assertRaises(TapeError):
+                    Interpreter(source, memsize=8, output=OutputSink()).run()
+                with self.assertRaises(TapeError):
+                    LaneInterpreter(2, source, memsize=8).run()
+
+    def test_exhaustive_less(self):
+        assembler = Assembler()
+        assembler.stack_pointer = 2
+        source = assembler.assemble("LESS @top @top @top")
+        a, b = np.meshgrid(np.arange(256), np.array([0, 1, 2, 100, 254, 255]))
+        lanes = LaneInterpreter(a.size, memsize=8)
+        lanes.memory[:, 0] = a.ravel()
+        lanes.memory[:, 1] = b.ravel()
+        lanes.dptr[:] = 2
+        lanes.run(source)
+        self.assertListEqual((a.ravel() < b.ravel()).astype(int).tolist(), lanes.memory[:, 0].tolist())
+        self.assertTrue((lanes.memory[:, 1:] == 0).all())
+        self.assertTrue((lanes.dptr == 1).all())
@@ -0,0 +1,59 @@
+from unittest import TestCase
+import threading
+
+from src.interpreter import Interpreter
+from src.interpreter.pool import InterpreterPool
+from src.interpreter.streams import InputSource, OutputSink
+
+
+class TestInterpreterPool(TestCase):
+
+    def test_reset(self):
+        interpreter = Interpreter(">" * 5000 + "+.", output=OutputSink())
+        interpreter.run()
+        allocated = interpreter.memory.high_water
+        interpreter.reset()
+        self.assertEqual((0, 0, 0), (interpreter.dptr, interpreter.iptr, interpreter.cycles))
+        self.assertEqual(allocated, interpreter.memory.high_water)
+        self.assertFalse(any(interpreter.memory.cells))
+        interpreter.run()
+        self.assertEqual(1, interpreter.memory[5000])
+
+    def test_reuse(self):
+        pool = InterpreterPool(size=1)
+        with pool.interpreter(OutputSink(), InputSource(b'a', eof=0)) as interpreter:
+            interpreter.run(",+.")
+            first = interpreter
+        with pool.interpreter(OutputSink(), InputSource(b'x', eof=0)) as interpreter:
+            self.assertIs(first, interpreter)
+            interpreter.run(",+.")
+            self.assertEqual(b'y', interpreter.output.getvalue())
+        self.assertEqual(1, pool.created)
+        # The empty program the interpreter was built with, and the one it ran.
+        self.assertEqual(2, pool.cache.misses)
+
+    def test_capacity(self):
+        pool = InterpreterPool(capacity=1)
+        interpreters = [pool.acquire(OutputSink()) for _ in range(3)]
+        for interpreter in interpreters:
+            pool.release(interpreter)
+        self.assertEqual(3, pool.created)
+        self.assertEqual(1, len(pool.idle))
+
+    def test_threads(self):
+        pool = InterpreterPool()
+        results = {}
+
+        def work(n):
+            for _ in range(20):
+                with pool.interpreter(OutputSink()) as interpreter:
+                    interpreter.run('+' * n + '.')
+                    results[n] = interpreter.output.getvalue()
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({n: bytes([n]) for n in range(1, 5)}, results)
+        self.assertLessEqual(pool.created, 4)
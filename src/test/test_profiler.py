@@ -0,0 +1,83 @@
+from unittest import TestCase
+import json
+
+from src.interpreter import Interpreter
+from src.interpreter.profiler import ProfilingInterpreter
+from src.interpreter.streams import OutputSink
+from src.test.conformance import EngineConformance
+
+
+class TestProfiler(TestCase):
+
+    def profile(self, source, optimize=True):
+        interpreter = ProfilingInterpreter(output=OutputSink())
+        interpreter.compiler.optimize = optimize
+        interpreter.run(source)
+        return interpreter
+
+    def test_cycles(self):
+        with open('test/HelloWorld.bf') as file:
+            source = file.read()
+        expected = Interpreter(source, output=OutputSink())
+        expected.run()
+        for optimize in (True, False):
+            with self.subTest(optimize=optimize):
+                interpreter = self.profile(source, optimize)
+                self.assertEqual(expected.cycles, interpreter.cycles)
+                self.assertEqual(expected.cycles, interpreter.profile.cycles)
+                self.assertEqual(expected.output.getvalue(), interpreter.output.getvalue())
+
+    def test_loops(self):
+        source = "+++[>++[-]<-]\n>[>+<-]"
+        for optimize in (True, False):
+            with self.subTest(optimize=optimize):
+                loops = {row['position']: row for row in self.profile(source, optimize).profile.loops()}
+                self.assertEqual((1, 3, 1 + 3 * (10 + 1)), (loops[3]['entries'], loops[3]['iterations'],
+                                                            loops[3]['cycles']))
+                self.assertEqual((3, 6), (loops[7]['entries'], loops[7]['iterations']))
+                self.assertEqual((2, 2), (loops[15]['line'], loops[15]['column']))
+                self.assertEqual(1, loops[15]['cycles'])
+
+    def test_positions(self):
+        profile = self.profile("++ +[>+<-].", optimize=False).profile
+        positions = {row['position']: row for row in profile.positions()}
+        self.assertEqual('+++', positions[0]['text'])
+        self.assertEqual(1, positions[0]['executions'])
+        self.assertEqual(3, positions[5]['executions'])
+        self.assertEqual(']', positions[9]['text'])
+        self.assertEqual(3, positions[9]['executions'])
+        self.assertEqual({'executions': 6, 'cycles': 6}, profile.histogram()['MOVE'])
+
+    def test_carried(self):
+        # The moves are carried by the operations after them, and the removed loop by the ADD.
+        profile = self.profile(">>>+<<<.>>+++<<[-]+[>+<-][-]").profile
+        positions = {(row['position'], row['op']): (row['text'], row['cycles']) for row in profile.positions()}
+        self.assertEqual(('>>>', 3), positions[(0, 'MOVE')])
+        self.assertEqual(('+', 1), positions[(3, 'ADD_AT')])
+        self.assertEqual(('<<<', 3), positions[(4, 'MOVE')])
+        self.assertEqual(('.', 1), positions[(7, 'OUTPUT')])
+        self.assertEqual(('<<', 2), positions[(13, 'MOVE')])
+        self.assertEqual(('[-]', 1), positions[(15, 'CLEAR')])
+        self.assertEqual(('[>+<-]', 6), positions[(19, 'MULTIPLY')])
+        self.assertEqual(('[-]', 1), positions[(25, 'CLEAR')])
+        self.assertEqual(profile.cycles, sum(row['cycles'] for row in profile.positions()))
+        self.assertEqual(10, profile.histogram()['MOVE']['cycles'])
+        loops = {row['position']: row for row in profile.loops()}
+        self.assertEqual(1, loops[15]['cycles'])
+
+    def test_reports(self):
+        profile = self.profile("++[>+<-]>.").profile
+        data = json.loads(profile.to_json())
+        self.assertEqual(profile.cycles, data['cycles'])
+        self.assertEqual('MULTIPLY', data['loops'][0]['op'])
+        self.assertIn('MULTIPLY', profile.report())
+
+    def test_limit(self):
+        interpreter = ProfilingInterpreter("+[]", output=OutputSink())
+        self.assertFalse(interpreter.run(max_cycles=100))
+        self.assertEqual(interpreter.cycles, interpreter.profile.cycles)
+
+
+class TestProfilingConformance(EngineConformance, TestCase):
+
+    engine = ProfilingInterpreter
@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from src.interpreter import Interpreter
+from src.interpreter.scheduler import FAILED, FINISHED, PARKED, READY, THROTTLED, WEIGHTED, Scheduler
+from src.interpreter.streams import InputQueue, InputSource, OutputSink
+
+
+class TestScheduler(TestCase):
+
+    def test_round_robin(self):
+        scheduler = Scheduler(slice_cycles=100)
+        source = ",++++++++[>++++++++[>+.<-]<-]"
+        tasks = [scheduler.spawn(source, input=InputSource(b'\0')) for _ in range(3)]
+        order = [scheduler.step().number for _ in range(6)]
+        self.assertListEqual([0, 1, 2, 0, 1, 2], order)
+        scheduler.run()
+        expected = Interpreter(source, output=OutputSink(), input=InputSource(b'\0'))
+        expected.run()
+        for task in tasks:
+            self.assertEqual(FINISHED, task.state)
+            self.assertEqual(expected.output.getvalue(), task.output.getvalue())
+            self.assertEqual(expected.cycles, task.cycles)
+
+    def test_weighted(self):
+        scheduler = Scheduler(slice_cycles=100, policy=WEIGHTED)
+        light = scheduler.spawn(",+[]", input=InputSource(b''))
+        heavy = scheduler.spawn(",+[]", weight=3, input=InputSource(b''))
+        scheduler.run(max_slices=400)
+        self.assertAlmostEqual(3, heavy.cycles / light.cycles, delta=0.1)
+        # A task that joins late does not get to catch up.
+        late = scheduler.spawn(",+[]", input=InputSource(b''))
+        scheduler.run(max_slices=20)
+        self.assertLess(late.slices, 10)
+
+    def test_parking(self):
+        scheduler = Scheduler()
+        echo = scheduler.spawn(",[.,]", input=InputQueue(eof=0))
+        busy = scheduler.spawn("+++[>+++++<-]>[-]")
+        self.assertEqual(2, scheduler.run())
+        self.assertEqual((PARKED, FINISHED), (echo.state, busy.state))
+        echo.feed(b'hello')
+        self.assertEqual(READY, echo.state)
+        scheduler.run()
+        self.assertEqual(PARKED, echo.state)
+        echo.input.feed(b', world')
+        scheduler.run()
+        echo.close()
+        scheduler.run()
+        self.assertEqual(FINISHED, echo.state)
+        self.assertEqual(b'hello, world', echo.output.getvalue())
+
+    def test_quotas(self):
+        scheduler = Scheduler(slice_cycles=100, quotas={'a': 1000})
+        first = scheduler.spawn("+[]", tenant='a', input=InputSource(b''))
+        second = scheduler.spawn("+[]", tenant='a', input=InputSource(b''))
+        other = scheduler.spawn("+[>+<]", tenant='b', input=InputSource(b''))
+        scheduler.run(max_slices=100)
+        self.assertEqual((THROTTLED, THROTTLED, READY), (first.state, second.state, other.state))
+        self.assertLessEqual(first.cycles + second.cycles, 1010)
+        scheduler.set_quota('a', 2000)
+        self.assertEqual((READY, READY), (first.state, second.state))
+        scheduler.run(max_slices=100)
+        self.assertLessEqual(scheduler.usage['a'], 2010)
+        stats = scheduler.stats()
+        self.assertEqual((3, 2, 1), (stats['tasks'], stats[THROTTLED], stats[READY]))
+        self.assertEqual(stats['cycles'], sum(stats['tenants'].values()))
+        self.assertEqual(200, stats['slices'])
+
+    def test_failures(self):
+        scheduler = Scheduler(memsize=4)
+        broken = scheduler.spawn("+[>+]")
+        unbalanced = scheduler.spawn("[")
+        fine = scheduler.spawn("+.")
+        scheduler.run()
+        self.assertEqual((FAILED, FAILED, FINISHED), (broken.state, unbalanced.state, fine.state))
+        self.assertIsInstance(unbalanced.error, ValueError)
+        scheduler.remove(broken)
+        self.assertEqual(1, len(scheduler.pool.idle))
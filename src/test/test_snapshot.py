@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from src.interpreter import Interpreter
+from src.interpreter.codegen import CodegenInterpreter
+from src.interpreter.snapshot import Snapshot
+from src.interpreter.streams import InputSource, OutputSink
+
+
+class TestSnapshot(TestCase):
+
+    # Fills two cells and prints a marker, then adds the input byte to one of them.
+    SOURCE = "++++++++[>++++++++<-]>[->+>++<<]>>>" + "+" * 33 + ".[-]," + "[<+>-]<."
+
+    def run_whole(self, data):
+        interpreter = Interpreter(self.SOURCE, output=OutputSink(), input=InputSource(data, eof=0))
+        interpreter.run()
+        return interpreter
+
+    def test_take(self):
+        snapshot = Snapshot.take(self.SOURCE)
+        self.assertFalse(snapshot.finished)
+        self.assertEqual(b'!', snapshot.output)
+        self.assertEqual(',', self.SOURCE[Interpreter(self.SOURCE).program.ops[snapshot.iptr].pos])
+        with self.assertRaises(AttributeError):
+            snapshot.dptr = 0
+
+    def test_fork(self):
+        for engine in (Interpreter, CodegenInterpreter):
+            snapshot = Snapshot.take(self.SOURCE, engine)
+            for data in (b'\x01', b'\x05', b''):
+                with self.subTest(engine=engine.__name__, data=data):
+                    expected = self.run_whole(data)
+                    interpreter = snapshot.fork(InputSource(data, eof=0), OutputSink())
+                    self.assertTrue(interpreter.resume())
+                    self.assertEqual(expected.output.getvalue(), interpreter.output.getvalue())
+                    self.assertEqual(expected.memory[:], interpreter.memory[:])
+                    self.assertEqual(expected.cycles, interpreter.cycles)
+            self.assertEqual(b'!', snapshot.output)
+            self.assertEqual(snapshot.cells, Snapshot.take(self.SOURCE, engine).cells)
+
+    def test_max_cycles(self):
+        snapshot = Snapshot.take(self.SOURCE, max_cycles=50)
+        interpreter = snapshot.fork(InputSource(b'\x02', eof=0), OutputSink())
+        self.assertTrue(interpreter.resume())
+        self.assertEqual(self.run_whole(b'\x02').output.getvalue(), interpreter.output.getvalue())
+
+    def test_finished(self):
+        snapshot = Snapshot.take("++.")
+        self.assertTrue(snapshot.finished)
+        self.assertTrue(snapshot.fork(output=OutputSink()).resume())
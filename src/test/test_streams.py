@@ -0,0 +1,73 @@
+from unittest import TestCase
+import io
+
+from src.interpreter.streams import InputSource, OutputSink
+
+
+class TestOutputSink(TestCase):
+
+    def test_getvalue(self):
+        sink = OutputSink()
+        for value in b'abc':
+            sink.put(value)
+        self.assertEqual(b'abc', sink.getvalue())
+
+    def test_chunk_size(self):
+        chunks = []
+        sink = OutputSink(chunks.append, chunk_size=2)
+        for value in b'abcde':
+            sink.put(value)
+        self.assertListEqual([b'ab', b'cd'], chunks)
+        sink.finish()
+        self.assertListEqual([b'ab', b'cd', b'e'], chunks)
+
+    def test_flush_on_newline(self):
+        chunks = []
+        sink = OutputSink(chunks.append, flush_on_newline=True)
+        for value in b'ab\ncd':
+            sink.put(value)
+        self.assertListEqual([b'ab\n'], chunks)
+
+    def test_writer(self):
+        writer = io.BytesIO()
+        sink = OutputSink(writer, trailer=b'!')
+        sink.put(255)
+        sink.finish()
+        self.assertEqual(b'\xff!', writer.getvalue())
+        with self.assertRaises(ValueError):
+            sink.getvalue()
+
+
+class TestInputSource(TestCase):
+
+    def readall(self, source, count):
+        return [source.read() for _ in range(count)]
+
+    def test_bytes(self):
+        source = InputSource(b'ab')
+        self.assertListEqual([97, 98, None, None], self.readall(source, 4))
+        self.assertEqual(2, source.position)
+
+    def test_eof(self):
+        self.assertListEqual([97, 0], self.readall(InputSource('a', eof=0), 2))
+        self.assertListEqual([97, 255], self.readall(InputSource(memoryview(b'a'), eof=255), 2))
+
+    def test_file(self):
+        source = InputSource(io.BytesIO(b'abcde'), blocksize=2)
+        self.assertListEqual([97, 98, 99, 100, 101, None], self.readall(source, 6))
+        self.assertEqual(5, source.position)
+
+    def test_skip(self):
+        source = InputSource(io.BytesIO(b'abcde'), blocksize=2)
+        self.assertEqual(3, source.skip(3))
+        self.assertListEqual([100], self.readall(source, 1))
+        self.assertEqual(1, source.skip(5))
+        self.assertEqual(5, source.position)
+
+    def test_text_file(self):
+        source = InputSource(io.StringIO('ab'))
+        self.assertListEqual([97, 98, None], self.readall(source, 3))
+
+    def test_chunks(self):
+        source = InputSource(iter([b'a', b'', bytearray(b'bc')]))
+        self.assertListEqual([97, 98, 99, None], self.readall(source, 4))
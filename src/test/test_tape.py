@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from src.interpreter import Interpreter
+from src.interpreter.streams import OutputSink
+from src.interpreter.tape import Tape, TapeError
+
+
+class TestTape(TestCase):
+
+    def test_grow(self):
+        tape = Tape(100, page_size=16)
+        self.assertEqual(16, tape.high_water)
+        self.assertEqual(0, tape[50])
+        self.assertEqual(16, tape.high_water)
+        tape[50] = 3
+        self.assertEqual(64, tape.high_water)
+        self.assertEqual(3, tape[50])
+        tape[99] = 1
+        self.assertEqual(100, tape.high_water)
+        with self.assertRaises(TapeError):
+            tape.grow(100)
+        with self.assertRaises(TapeError):
+            tape.reserve(-1)
+
+    def test_slices(self):
+        tape = Tape(8, page_size=2)
+        tape[1] = 5
+        self.assertEqual([0, 5, 0, 0, 0, 0, 0, 0], tape[:])
+        self.assertEqual([0, 5, 0], tape[2::-1])
+        self.assertEqual([0, 5, 0, 0, 0, 0, 0, 0], list(tape))
+        self.assertEqual(8, len(tape))
+
+    def test_scan(self):
+        tape = Tape(100, page_size=16)
+        tape.cells[:] = b'\x01' * 16
+        self.assertEqual(16, tape.scan(0, 1))
+        self.assertEqual(32, tape.high_water)
+        self.assertEqual(18, tape.scan(3, 3))
+        tape.cells[4] = 0
+        self.assertEqual(4, tape.scan(10, -2))
+        with self.assertRaises(TapeError):
+            tape.scan(9, -2)
+
+    def test_sparse(self):
+        interpreter = Interpreter(">" * 20000 + "+" + "<" * 20000, memsize=1000000, output=OutputSink())
+        interpreter.run()
+        self.assertEqual(1, interpreter.memory[20000])
+        self.assertEqual(20480, interpreter.memory.high_water)
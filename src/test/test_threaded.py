@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from src.interpreter import Interpreter
+from src.interpreter.streams import InputQueue, OutputSink
+from src.interpreter.threaded import ThreadedInterpreter
+from src.test.conformance import EngineConformance
+
+
+class TestThreadedInterpreter(EngineConformance, TestCase):
+
+    engine = ThreadedInterpreter
+
+    def test_idioms(self):
+        self.assertSameRun("+++++[>+++<-]>[>++<-]>>+>+>+<<<[>]<[<]>[-]+[+]>>+++[>+>>+<<<-]>>>.<+.,")
+
+    def test_resume(self):
+        source = "++++++++[>++++++++<-]>[.-]"
+        complete = Interpreter(source, output=OutputSink())
+        complete.run()
+        interpreter = ThreadedInterpreter(source, output=OutputSink())
+        self.assertFalse(interpreter.run(max_cycles=10))
+        while not interpreter.resume(interpreter.cycles + 10):
+            pass
+        self.assertEqual(complete.output.getvalue(), interpreter.output.getvalue())
+        self.assertEqual(complete.cycles, interpreter.cycles)
+
+    def test_waiting(self):
+        queue = InputQueue()
+        interpreter = ThreadedInterpreter("+>,.", output=OutputSink(), input=queue)
+        self.assertFalse(interpreter.run())
+        self.assertTrue(interpreter.waiting)
+        # The move is counted with the ',' it was folded into.
+        self.assertEqual(1, interpreter.cycles)
+        queue.feed(b'a')
+        self.assertTrue(interpreter.resume())
+        self.assertEqual((b'a', 4), (interpreter.output.getvalue(), interpreter.cycles))
+
+    def test_rebind(self):
+        interpreter = ThreadedInterpreter("+.", output=OutputSink())
+        interpreter.run()
+        interpreter.attach(OutputSink())
+        interpreter.reset()
+        interpreter.run()
+        self.assertEqual(b'\x01', interpreter.output.getvalue())
@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from src.interpreter import Interpreter
+from src.interpreter.streams import InputQueue, OutputSink
+from src.interpreter.tiered import TieredInterpreter
+from src.test.conformance import EngineConformance
+
+
+class TestTieredInterpreter(EngineConformance, TestCase):
+
+    engine = TieredInterpreter
+
+    def create(self, **kwargs):
+        interpreter = super().create(**kwargs)
+        interpreter.threshold = 10
+        return interpreter
+
+    def test_hot_loops(self):
+        interpreter = self.assertSameRun("++++[>++++[>+++[>+.<-]>[<+>-]<<-]<-]>>[.-]")
+        # The outer loop jumps back 3 times and is never compiled. The others are, in the
+        # order they get hot.
+        self.assertListEqual([7, 4, 21], [start for start, function in interpreter.functions.items() if function])
+
+    def test_resume(self):
+        source = "++++++++[>++++++++[>+>+.<<-]>[.-]<<-]"
+        complete = Interpreter(source, output=OutputSink())
+        complete.run()
+        interpreter = self.create()
+        self.assertFalse(interpreter.run(source, max_cycles=10))
+        while not interpreter.resume(interpreter.cycles + 100):
+            pass
+        self.assertTrue(interpreter.functions)
+        self.assertEqual(complete.output.getvalue(), interpreter.output.getvalue())
+        self.assertEqual(complete.cycles, interpreter.cycles)
+
+    def test_waiting(self):
+        queue = InputQueue()
+        interpreter = self.create(input=queue)
+        self.assertFalse(interpreter.run("+[,.]"))
+        self.assertTrue(interpreter.waiting)
+        for _ in range(20):
+            queue.feed(b'a')
+            self.assertFalse(interpreter.resume())
+        # A loop that may wait for input is never compiled.
+        self.assertListEqual([None], list(interpreter.functions.values()))
+        self.assertEqual(b'a' * 20, interpreter.output.getvalue())